@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+
+# Audio containers yt_dlp may hand back for bestaudio; anything else in the directory is ignored
+AUDIO_EXTENSIONS = ('.webm', '.opus', '.m4a', '.ogg', '.mp3')
+
+
+class AudioCache:
+    # Local copies of tracks that keep getting played, so they stop being streamed (and
+    # extracted) from YouTube for every guild. A video is downloaded once it has been played
+    # `min_plays` times; files are evicted least-recently-played first to stay under `max_bytes`.
+    # Files are named <video_id>.<ext>, so the index can be rebuilt from the directory on start.
+    def __init__(self, download, directory='audio_cache', max_bytes=5 * 1024 ** 3, min_plays=3, max_downloads=2, max_tracked=10000):
+        self.download = download  # coroutine function: video_id -> path of the downloaded file
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.max_tracked = max_tracked
+
+        self._files = OrderedDict()  # video_id -> (path, size), least recently played first
+        self._bytes = 0
+        self._plays = OrderedDict()  # video_id -> play count, for videos not cached yet
+        self._downloads = {}  # video_id -> asyncio.Task
+        self._download_limit = asyncio.Semaphore(max_downloads)
+
+        self.hits = 0
+        self.misses = 0
+        self.downloaded = 0
+        self.evicted = 0
+
+    async def start(self):
+        # Index files left by an earlier run without blocking the loop
+        loop = asyncio.get_running_loop()
+        files = await loop.run_in_executor(None, self._scan)
+        for video_id, path, size in files:
+            self._add(video_id, path, size)
+        self._evict()
+        if files:
+            logging.info(f"Audio cache: {len(self._files)} tracks, {self._bytes / 1024 ** 2:.0f} MB")
+
+    def _scan(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            video_id, extension = os.path.splitext(entry.name)
+            if entry.is_file() and extension in AUDIO_EXTENSIONS:
+                stat = entry.stat()
+                files.append((stat.st_mtime, video_id, entry.path, stat.st_size))
+        # Oldest first, so the LRU order matches when the files were last played
+        return [(video_id, path, size) for _, video_id, path, size in sorted(files)]
+
+    def _add(self, video_id, path, size):
+        old = self._files.pop(video_id, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._files[video_id] = (path, size)
+        self._bytes += size
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._files:
+            video_id, (path, size) = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evicted += 1
+            try:
+                os.remove(path)
+            except OSError as e:
+                # Still open by ffmpeg on some platforms; it is out of the index either way
+                logging.warning(f"Could not remove cached audio {path}: {e}")
+
+    def __contains__(self, video_id):
+        return video_id in self._files
+
+    def get(self, video_id):
+        # Path of the local copy, or None
+        cached = self._files.get(video_id)
+        if cached is None:
+            self.misses += 1
+            return None
+        path = cached[0]
+        if not os.path.exists(path):
+            # Removed behind our back
+            self._files.pop(video_id)
+            self._bytes -= cached[1]
+            self.misses += 1
+            return None
+        self._files.move_to_end(video_id)
+        self.hits += 1
+        try:
+            os.utime(path)  # keeps the LRU order across restarts
+        except OSError:
+            pass
+        return path
+
+    def record_play(self, video_id):
+        # Count a play; starts a background download once the video is popular enough
+        if not video_id or video_id in self._files or video_id in self._downloads:
+            return
+        plays = self._plays.pop(video_id, 0) + 1
+        if plays < self.min_plays:
+            self._plays[video_id] = plays
+            while len(self._plays) > self.max_tracked:
+                self._plays.popitem(last=False)
+            return
+
+        task = asyncio.create_task(self._fetch(video_id))
+        self._downloads[video_id] = task
+        task.add_done_callback(lambda task: self._downloads.pop(video_id, None))
+
+    async def _fetch(self, video_id):
+        try:
+            async with self._download_limit:
+                path = await self.download(video_id)
+            size = os.path.getsize(path)
+        except Exception as e:
+            logging.warning(f"Caching audio for {video_id} failed: {e}")
+            return
+        self._add(video_id, path, size)
+        self.downloaded += 1
+        self._evict()
+
+    def close(self):
+        for task in self._downloads.values():
+            task.cancel()
+
+    def stats(self):
+        return {
+            'tracks': len(self._files),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'downloading': len(self._downloads),
+            'downloaded': self.downloaded,
+            'evicted': self.evicted,
+        }
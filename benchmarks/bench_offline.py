@@ -0,0 +1,344 @@
+# End-to-end benchmark of Bot without Discord or YouTube. The real command handlers, player
+# loop, caches and API client run against the stand-ins in fakes.py: yt_dlp with a fixed
+# extraction latency, a local Data API server and a voice backend that consumes frames in real
+# time. Each (scenario, guild count) pair runs in a fresh interpreter, so peak RSS and caches
+# are per run.
+#
+# Scenarios:
+#   play_burst      every guild runs /play with a single video at the same moment
+#   viral_burst     the same, but every guild plays the same video
+#   large_playlist  every guild queues a long playlist; runs until every page is loaded
+#   skip_storm      every guild plays a playlist and then /skips through it quickly
+#   queue_spam      every guild has a long queue and sends many /queue at once
+#
+# Reported per run: time to first audio and inter-track gap (p50/p95/max), command latency,
+# throughput, peak RSS and event loop lag. Results are JSON so two versions can be compared:
+#
+#   python benchmarks/bench_offline.py --guilds 1,100,5000 --output before.json
+#   python benchmarks/bench_offline.py --guilds 1,100,5000 --output after.json --compare before.json
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ('play_burst', 'viral_burst', 'large_playlist', 'skip_storm', 'queue_spam')
+GUILD_ID_BASE = 10 ** 17  # snowflake-sized IDs
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {'count': len(ordered), 'p50': at(0.5), 'p95': at(0.95), 'max': ordered[-1]}
+
+
+class Harness:
+    # Fake guilds and users plus the measurements taken while a scenario runs
+    def __init__(self, bot_module, fakes, args):
+        self.module = bot_module
+        self.bot = bot_module.bot
+        self.fakes = fakes
+        self.args = args
+        self.backend = fakes.FakeVoiceBackend()
+        self.guilds = [fakes.FakeGuild(GUILD_ID_BASE + i, self.backend, args.connect_latency) for i in range(args.guilds)]
+        self.guild_by_id = {guild.id: guild for guild in self.guilds}
+
+        self.first_audio = []
+        self.gaps = []
+        self.command_latency = []
+        self.tracks_started = 0
+        self.lags = []
+        self.phase_start = time.monotonic()
+
+        # Not logged in, so the bot has no guild cache of its own
+        self.bot.get_guild = self.guild_by_id.get
+
+        # Record the raw samples behind the first-frame histograms
+        on_first_frame = self.bot.on_first_frame
+
+        def record_first_frame(requested_at, gap_start):
+            now = time.monotonic()
+            self.tracks_started += 1
+            if requested_at is not None:
+                self.first_audio.append(now - requested_at)
+            if gap_start is not None:
+                self.gaps.append(now - gap_start)
+            on_first_frame(requested_at, gap_start)
+        self.bot.on_first_frame = record_first_frame
+
+        # Audio comes from the fake backend instead of ffmpeg
+        frames = max(1, int(args.track_seconds / fakes.FRAME_SECONDS))
+        self.module.Bot.YTDLSource.create_ffmpeg_source = lambda source: fakes.FakeAudioSource(frames, opus=source.passthrough)
+
+    def reset(self):
+        # Drop what the set-up phase measured; the measured phase starts now
+        self.phase_start = time.monotonic()
+        self.first_audio.clear()
+        self.gaps.clear()
+        self.command_latency.clear()
+        self.tracks_started = 0
+        self.lags.clear()
+
+    def interaction(self, guild):
+        return self.fakes.FakeInteraction(guild, self.fakes.FakeUser(guild.id + 1, guild))
+
+    async def command(self, handler, *args):
+        start = time.monotonic()
+        await handler(*args)
+        self.command_latency.append(time.monotonic() - start)
+
+    async def play(self, guild, url):
+        await self.command(self.bot.play, self.interaction(guild), url)
+
+    async def skip(self, guild):
+        await self.command(self.module.skip.callback, self.interaction(guild), None)
+
+    async def show_queue(self, guild):
+        await self.command(self.module.show_queue.callback, self.interaction(guild))
+
+    async def wait_for(self, condition):
+        deadline = time.monotonic() + self.args.timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def ingesting(self):
+        return any(player.ingest_tasks for player in self.bot.players)
+
+    async def sample_lag(self, interval=0.05):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.lags.append(max(loop.time() - start - interval, 0.0))
+
+
+def video_url(index):
+    return f"https://www.youtube.com/watch?v=v{index:010d}"
+
+
+def playlist_url(length):
+    return f"https://www.youtube.com/playlist?list=PLbench{length}"
+
+
+async def play_burst(h):
+    await asyncio.gather(*(h.play(guild, video_url(i)) for i, guild in enumerate(h.guilds)))
+    return await h.wait_for(lambda: len(h.first_audio) >= len(h.guilds))
+
+
+async def viral_burst(h):
+    await asyncio.gather(*(h.play(guild, video_url(0)) for guild in h.guilds))
+    return await h.wait_for(lambda: len(h.first_audio) >= len(h.guilds))
+
+
+async def large_playlist(h):
+    await asyncio.gather(*(h.play(guild, playlist_url(h.args.playlist_size)) for guild in h.guilds))
+    return await h.wait_for(lambda: len(h.first_audio) >= len(h.guilds) and not h.ingesting())
+
+
+async def skip_storm(h):
+    await asyncio.gather(*(h.play(guild, playlist_url(h.args.skips + 5)) for guild in h.guilds))
+    if not await h.wait_for(lambda: len(h.first_audio) >= len(h.guilds) and not h.ingesting()):
+        return False
+    h.reset()
+
+    async def storm(guild):
+        for _ in range(h.args.skips):
+            await h.skip(guild)
+            await asyncio.sleep(h.args.skip_interval)
+
+    await asyncio.gather(*(storm(guild) for guild in h.guilds))
+    # Every guild should be playing again after its last skip
+    return await h.wait_for(lambda: all(guild.voice_client and guild.voice_client.is_playing() for guild in h.guilds))
+
+
+async def queue_spam(h):
+    await asyncio.gather(*(h.play(guild, playlist_url(h.args.playlist_size)) for guild in h.guilds))
+    if not await h.wait_for(lambda: len(h.first_audio) >= len(h.guilds) and not h.ingesting()):
+        return False
+    h.reset()
+    await asyncio.gather(*(h.show_queue(guild) for guild in h.guilds for _ in range(h.args.queue_requests)))
+    return True
+
+
+async def run_scenario(h, scenario):
+    bot = h.bot
+    bot.queue_store.start()
+    watchdog = asyncio.create_task(bot.watchdog.run())
+    lag = asyncio.create_task(h.sample_lag())
+
+    h.phase_start = time.monotonic()
+    completed = await globals()[scenario](h)
+    duration = time.monotonic() - h.phase_start
+
+    lag.cancel()
+    watchdog.cancel()
+    h.backend.close()
+    await bot.queue_store.close()
+
+    return {
+        'scenario': scenario,
+        'guilds': len(h.guilds),
+        'completed': completed,  # False when the run hit --timeout
+        'duration_s': duration,
+        'commands': len(h.command_latency),
+        'commands_per_s': len(h.command_latency) / duration if duration else None,
+        'tracks_started': h.tracks_started,
+        'queued_songs': sum(len(player.queue) for player in bot.players),
+        'time_to_first_audio_s': percentiles(h.first_audio),
+        'inter_track_gap_s': percentiles(h.gaps),
+        'command_latency_s': percentiles(h.command_latency),
+        'loop_lag_s': percentiles(h.lags),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'fake_voice_late_ticks': h.backend.late_ticks,
+    }
+
+
+def run_child(args):
+    # One scenario in this process; prints a single JSON line
+    sys.path.insert(0, BOT_DIR)
+    import fakes
+
+    workdir = tempfile.mkdtemp(prefix='pikatunes-bench-')
+    with open(os.path.join(BOT_DIR, 'config.json')) as config_file:
+        config = json.load(config_file)
+    config.update({
+        'youtube_api_key': 'offline-benchmark',
+        'youtube_daily_quota': 10 ** 9,
+        'youtube_quota_burst': 10 ** 9,
+        'audio_cache_enabled': False,
+        'metrics_enabled': False,
+    })
+    with open(os.path.join(workdir, 'config.json'), 'w') as config_file:
+        json.dump(config, config_file)
+
+    # bot.py reads config.json and writes bot.log and its SQLite files in the working directory
+    os.chdir(workdir)
+    sys.modules['yt_dlp'] = fakes.make_fake_yt_dlp(latency=args.extract_latency, track_seconds=args.track_seconds)
+    api = fakes.FakeDataAPI(latency=args.api_latency, track_seconds=args.track_seconds).start()
+
+    import youtube_api
+    youtube_api.API_URL = api.url
+    import bot as bot_module
+
+    harness = Harness(bot_module, fakes, args)
+    status = 0
+    try:
+        result = bot_module.bot.loop.run_until_complete(run_scenario(harness, args.run))
+        result['api_requests'] = api.requests
+        result['extractions'] = sys.modules['yt_dlp'].YoutubeDL.calls
+        print(json.dumps(result))
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        shutil.rmtree(workdir, ignore_errors=True)
+        # Worker threads may still be sleeping in the fake extractor
+        os._exit(status)
+
+
+def child_args(args, scenario, guilds):
+    return [
+        sys.executable, os.path.abspath(__file__), '--run', scenario, '--guilds', str(guilds),
+        '--track-seconds', str(args.track_seconds), '--extract-latency', str(args.extract_latency),
+        '--api-latency', str(args.api_latency), '--connect-latency', str(args.connect_latency),
+        '--playlist-size', str(args.playlist_size), '--skips', str(args.skips),
+        '--skip-interval', str(args.skip_interval), '--queue-requests', str(args.queue_requests),
+        '--timeout', str(args.timeout),
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    # Ratios current / previous for the headline numbers; below 1.0 is better except for throughput
+    old = {(result['scenario'], result['guilds']): result for result in previous['results']}
+    rows = []
+    for result in current['results']:
+        before = old.get((result['scenario'], result['guilds']))
+        if not before:
+            continue
+        row = {'scenario': result['scenario'], 'guilds': result['guilds']}
+        for key in ('time_to_first_audio_s', 'inter_track_gap_s', 'command_latency_s', 'loop_lag_s'):
+            if result.get(key) and before.get(key) and before[key]['p95']:
+                row[f"{key}_p95"] = result[key]['p95'] / before[key]['p95']
+        for key in ('commands_per_s', 'peak_rss_mb'):
+            if result.get(key) and before.get(key):
+                row[key] = result[key] / before[key]
+        rows.append(row)
+    return {'previous': previous.get('revision'), 'current': current.get('revision'), 'ratios': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--guilds', default='1,100,5000', help='Comma separated guild counts (one number with --run)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--track-seconds', type=float, default=2.0)
+    parser.add_argument('--extract-latency', type=float, default=0.02, help='Seconds per fake yt_dlp extraction')
+    parser.add_argument('--api-latency', type=float, default=0.02, help='Seconds per fake Data API response')
+    parser.add_argument('--connect-latency', type=float, default=0.01, help='Seconds per fake voice connect')
+    parser.add_argument('--playlist-size', type=int, default=200)
+    parser.add_argument('--skips', type=int, default=10, help='/skip commands per guild in skip_storm')
+    parser.add_argument('--skip-interval', type=float, default=0.2)
+    parser.add_argument('--queue-requests', type=int, default=10, help='/queue commands per guild in queue_spam')
+    parser.add_argument('--timeout', type=float, default=600, help='Give up on a scenario after this many seconds')
+    parser.add_argument('--output', default=None, help='Write the results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Results JSON of an earlier version to compare against')
+    parser.add_argument('--run', default=None, choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        args.guilds = int(args.guilds)
+        run_child(args)
+        return
+
+    results = []
+    for scenario in args.scenarios.split(','):
+        for guilds in (int(count) for count in args.guilds.split(',')):
+            output = subprocess.run(child_args(args, scenario, guilds), capture_output=True, text=True)
+            lines = output.stdout.strip().splitlines()
+            if output.returncode != 0 or not lines:
+                results.append({'scenario': scenario, 'guilds': guilds, 'error': output.stderr.strip()[-2000:]})
+            else:
+                results.append(json.loads(lines[-1]))
+            print(json.dumps(results[-1]), file=sys.stderr)
+
+    report = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'run')},
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare) as previous_file:
+            report['comparison'] = compare(json.load(previous_file), report)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# CPU per stream for the two playback paths of YTDLSource:
+#   pcm  - FFmpegPCMAudio: ffmpeg decodes to PCM, nextcord encodes Opus in Python threads
+#   opus - FFmpegOpusAudio(codec='opus'): ffmpeg copies the Opus packets, nothing is encoded
+# Every stream is read as fast as possible and the frames are Opus-encoded the way the voice
+# client does, so the result is CPU seconds (ffmpeg + Python) per second of audio per stream.
+#
+#   python benchmarks/bench_opus_passthrough.py --streams 8
+#   python benchmarks/bench_opus_passthrough.py --input some_track.webm
+#
+# Needs ffmpeg on PATH and libopus loadable by nextcord (for the pcm path); --libopus points
+# at a libopus that is not on the linker path.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import nextcord
+import nextcord.opus
+
+
+def make_sample(path, seconds):
+    # Opus-in-WebM like YouTube's audio formats
+    subprocess.run(
+        ['ffmpeg', '-loglevel', 'error', '-y', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+         '-f', 'lavfi', '-i', f'anoisesrc=duration={seconds}:amplitude=0.1',
+         '-filter_complex', 'amix=inputs=2', '-ac', '2', '-c:a', 'libopus', '-b:a', '128k', path],
+        check=True,
+    )
+
+
+def make_source(mode, path):
+    if mode == 'opus':
+        return nextcord.FFmpegOpusAudio(path, codec='opus', options='-vn')
+    return nextcord.FFmpegPCMAudio(path, options='-vn')
+
+
+def run_mode(mode, path, streams):
+    sources = [make_source(mode, path) for _ in range(streams)]
+    encoders = [nextcord.opus.Encoder() if mode == 'pcm' else None for _ in range(streams)]
+
+    start = os.times()
+    frames = 0
+    active = list(zip(sources, encoders))
+    while active:
+        for source, encoder in list(active):
+            data = source.read()
+            if not data:
+                source.cleanup()  # waits for ffmpeg, so its CPU time shows up in children_*
+                active.remove((source, encoder))
+                continue
+            if encoder is not None:
+                encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+            frames += 1
+    end = os.times()
+
+    ffmpeg_cpu = (end.children_user - start.children_user) + (end.children_system - start.children_system)
+    python_cpu = (end.user - start.user) + (end.system - start.system)
+    audio_seconds = frames * 0.02  # 20 ms per frame
+    return {
+        'streams': streams,
+        'audio_seconds': audio_seconds,
+        'ffmpeg_cpu_s': ffmpeg_cpu,
+        'python_cpu_s': python_cpu,
+        'cpu_per_audio_second': (ffmpeg_cpu + python_cpu) / audio_seconds if audio_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=4)
+    parser.add_argument('--seconds', type=int, default=60)
+    parser.add_argument('--input', default=None, help='Opus/WebM file to play instead of a generated one')
+    parser.add_argument('--libopus', default=None, help='path of the libopus shared library')
+    args = parser.parse_args()
+
+    if args.libopus:
+        nextcord.opus.load_opus(args.libopus)
+    if not nextcord.opus.is_loaded():
+        try:
+            nextcord.opus._load_default()
+        except Exception:
+            pass
+    if not nextcord.opus.is_loaded():
+        sys.exit('libopus could not be loaded; the pcm path cannot be measured')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.input
+        if path is None:
+            path = os.path.join(tmp, 'sample.webm')
+            make_sample(path, args.seconds)
+
+        result = {mode: run_mode(mode, path, args.streams) for mode in ('pcm', 'opus')}
+
+    pcm, opus = result['pcm']['cpu_per_audio_second'], result['opus']['cpu_per_audio_second']
+    if pcm and opus:
+        result['cpu_reduction'] = pcm / opus
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
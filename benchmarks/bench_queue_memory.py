@@ -0,0 +1,131 @@
+# Memory used by guild queues: the old representation (URL strings, plus the full yt_dlp
+# info_dict kept for every resolved track) against slotted QueueEntry records.
+#
+#   python benchmarks/bench_queue_memory.py --guilds 100 --queue-length 1000 --resolved 3
+
+import argparse
+import gc
+import json
+import os
+import random
+import string
+import sys
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from player import QueueEntry  # noqa: E402
+
+
+def random_id(length=11):
+    return ''.join(random.choices(string.ascii_letters + string.digits + '-_', k=length))
+
+
+def fake_stream_url(video_id):
+    # Roughly the size of a real googlevideo URL
+    return f"https://rr3---sn-{random_id(8)}.googlevideo.com/videoplayback?expire=1760000000&ei={random_id(20)}&id=o-{random_id(43)}&itag=251&source=youtube&mime=audio%2Fwebm&dur=215.341&lmt=1700000000000000&sig={random_id(120)}&lsig={random_id(90)}"
+
+
+def fake_info_dict(video_id):
+    # Shaped like yt_dlp's extract_info() output for a single YouTube video
+    formats = []
+    for itag in range(24):
+        formats.append({
+            'format_id': str(itag), 'format_note': 'medium', 'ext': 'webm', 'protocol': 'https',
+            'acodec': 'opus', 'vcodec': 'none' if itag < 5 else 'vp9', 'url': fake_stream_url(video_id),
+            'width': None if itag < 5 else 1280, 'height': None if itag < 5 else 720, 'fps': None,
+            'abr': 130.5, 'asr': 48000, 'filesize': 3500000 + itag, 'tbr': 130.5, 'quality': itag,
+            'has_drm': False, 'source_preference': -1, 'audio_channels': 2, 'language': 'en',
+            'http_headers': {'User-Agent': 'Mozilla/5.0 ' + random_id(60), 'Accept': 'text/html', 'Accept-Language': 'en-us,en;q=0.5'},
+            'downloader_options': {'http_chunk_size': 10485760}, 'format': f'{itag} - audio only (medium)',
+        })
+    thumbnails = [{'url': f"https://i.ytimg.com/vi/{video_id}/{name}.jpg", 'preference': -i, 'id': str(i), 'height': 90 * i, 'width': 120 * i}
+                  for i, name in enumerate(['default', 'mqdefault', 'hqdefault', 'sddefault', 'maxresdefault'] * 8)]
+    captions = {
+        language: [{'ext': ext, 'url': f"https://www.youtube.com/api/timedtext?v={video_id}&lang={language}&fmt={ext}&sig={random_id(40)}", 'name': language}
+                   for ext in ('json3', 'srv1', 'srv2', 'srv3', 'ttml', 'vtt')]
+        for language in (f"{a}{b}" for a in 'abcdefghij' for b in 'abcdefghij')
+    }
+    return {
+        'id': video_id, 'title': 'Some Song Title (Official Video) ' + random_id(10), 'duration': 215,
+        'channel': 'Some Channel', 'uploader': 'Some Channel', 'description': random_id(1500),
+        'tags': [random_id(8) for _ in range(30)], 'categories': ['Music'], 'view_count': 123456789,
+        'formats': formats, 'thumbnails': thumbnails, 'automatic_captions': captions, 'subtitles': {},
+        'url': formats[0]['url'], 'webpage_url': f"https://www.youtube.com/watch?v={video_id}",
+    }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, data
+
+
+def build_legacy(video_ids, resolved):
+    # deque of URL strings; resolved tracks kept their info_dict (YTDLSource.data / prefetch results)
+    queues = []
+    for guild_ids in video_ids:
+        queue = deque(f"https://www.youtube.com/watch?v={video_id}" for video_id in guild_ids)
+        info_dicts = [fake_info_dict(video_id) for video_id in guild_ids[:resolved]]
+        queues.append((queue, info_dicts))
+    return queues
+
+
+def build_entries(video_ids, resolved):
+    # deque of QueueEntry; extraction results are reduced to the entry immediately
+    queues = []
+    for guild_ids in video_ids:
+        queue = deque(QueueEntry(video_id=video_id, title='Some Song Title (Official Video) ' + random_id(10), duration=215, requester_id=820062277842632744)
+                      for video_id in guild_ids)
+        for entry in list(queue)[:resolved]:
+            info_dict = fake_info_dict(entry.video_id)
+            entry.apply_info(info_dict)
+            entry.set_stream(info_dict['url'], 1760000000)
+            del info_dict
+        queues.append(queue)
+    return queues
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare queue memory of URL strings + info_dicts against QueueEntry')
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--queue-length', type=int, default=1000)
+    parser.add_argument('--resolved', type=int, default=3, help='entries per guild holding a resolved stream (playing + prefetched)')
+    args = parser.parse_args()
+
+    random.seed(0)
+
+    # Warm up allocator caches and interned strings so the first measurement is not inflated
+    measure(lambda: build_legacy([[random_id()]], 1))
+    measure(lambda: build_entries([[random_id()]], 1))
+
+    video_ids = [[random_id() for _ in range(args.queue_length)] for _ in range(args.guilds)]
+
+    legacy_bytes, _ = measure(lambda: build_legacy(video_ids, args.resolved))
+    entry_bytes, _ = measure(lambda: build_entries(video_ids, args.resolved))
+
+    # The part the change targets: what each resolved track costs while it sits in memory
+    resolved_legacy, _ = measure(lambda: fake_info_dict(random_id()))
+    resolved_entry, _ = measure(lambda: build_entries([[random_id()]], 1))
+
+    print(json.dumps({
+        'guilds': args.guilds,
+        'queue_length': args.queue_length,
+        'resolved_per_guild': args.resolved,
+        'legacy_bytes_per_guild': legacy_bytes // args.guilds,
+        'queue_entry_bytes_per_guild': entry_bytes // args.guilds,
+        'legacy_bytes_per_resolved_track': resolved_legacy,
+        'queue_entry_bytes_per_resolved_track': resolved_entry,
+        'reduction_per_guild': round(legacy_bytes / entry_bytes, 1) if entry_bytes else None,
+        'reduction_per_resolved_track': round(resolved_legacy / resolved_entry, 1) if resolved_entry else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
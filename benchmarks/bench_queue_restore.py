@@ -0,0 +1,88 @@
+# Warm restart cost of the queue store: fill it with many guilds' queues, then time what a
+# restarted bot pays up front (nothing is read) and per guild when it is next used.
+#
+#   python benchmarks/bench_queue_restore.py --guilds 10000 --queue-length 50
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistence import QueueStore  # noqa: E402
+from player import PlayerRegistry, QueueEntry  # noqa: E402
+
+
+def random_id(length=11):
+    return ''.join(random.choices(string.ascii_letters + string.digits + '-_', k=length))
+
+
+async def populate(path, guilds, queue_length):
+    store = QueueStore(path)
+    players = PlayerRegistry(journal_for=store.journal_for)
+    for guild_id in range(1, guilds + 1):
+        player = players.get_or_create(guild_id)
+        player.queue.extend(QueueEntry(video_id=random_id(), title=random_id(30), duration=200) for _ in range(queue_length))
+        player.set_current_track(player.queue.popleft())
+    await store.flush()
+    await store.compact()
+
+    # A few ops after the last compaction, like a crash between compactions would leave behind
+    for guild_id in range(1, guilds + 1, 10):
+        players.get(guild_id).queue.popleft()
+    await store.close()
+
+
+async def restart(path, guilds, samples):
+    start = time.perf_counter()
+    store = QueueStore(path)
+    store.start()
+    startup = time.perf_counter() - start
+
+    load_times = []
+    for guild_id in random.sample(range(1, guilds + 1), samples):
+        start = time.perf_counter()
+        entries, now_playing = await store.load(guild_id)
+        [QueueEntry.from_record(record) for record in [now_playing] + entries]
+        load_times.append(time.perf_counter() - start)
+    await store.close()
+
+    load_times.sort()
+    return {
+        'startup_ms': startup * 1000,
+        'first_use_p50_ms': load_times[len(load_times) // 2] * 1000,
+        'first_use_max_ms': load_times[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--guilds', type=int, default=10000)
+    parser.add_argument('--queue-length', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'queues.sqlite3')
+        start = time.perf_counter()
+        asyncio.run(populate(path, args.guilds, args.queue_length))
+        populate_time = time.perf_counter() - start
+
+        result = asyncio.run(restart(path, args.guilds, min(args.samples, args.guilds)))
+        result.update({
+            'guilds': args.guilds,
+            'queue_length': args.queue_length,
+            'populate_s': populate_time,
+            'db_bytes': os.path.getsize(path),
+        })
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
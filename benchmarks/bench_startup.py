@@ -0,0 +1,61 @@
+# Cold start cost of the bot: time to import bot.py and build the Bot (everything before
+# logging in), plus what the lazily imported yt_dlp costs on first use. With --token the
+# child process also logs in and reports the time until on_ready.
+#
+#   python benchmarks/bench_startup.py --runs 5
+#   python benchmarks/bench_startup.py --runs 1 --token <bot token>
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per sample so nothing is already imported
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+import bot
+result = {'import_and_init_s': time.perf_counter() - start, 'modules_loaded': len(sys.modules)}
+
+token = sys.argv[1] if len(sys.argv) > 1 else None
+if token:
+    async def probe():
+        result['time_to_ready_s'] = time.perf_counter() - start
+        await bot.bot.close()
+    bot.bot.add_listener(probe, 'on_ready')
+    bot.bot.run(token)
+else:
+    # First use of the lazily imported yt_dlp (what warm_up does after login)
+    lazy_start = time.perf_counter()
+    import yt_dlp
+    result['yt_dlp_import_s'] = time.perf_counter() - lazy_start
+
+print(json.dumps(result))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--token', default=None)
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        command = [sys.executable, '-c', CHILD] + ([args.token] if args.token else [])
+        output = subprocess.run(command, cwd=BOT_DIR, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result = {'runs': args.runs}
+    for key in samples[0]:
+        values = [sample[key] for sample in samples]
+        result[key] = statistics.median(values)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+# Local stand-ins for everything the bot talks to, used by bench_offline.py:
+#   make_fake_yt_dlp  - module to install as yt_dlp; extract_info sleeps for a configurable latency
+#   FakeDataAPI       - YouTube Data API v3 subset (search, videos, playlists, playlistItems)
+#                       served over HTTP from its own thread, so the client code runs unchanged
+#   FakeVoiceBackend  - one thread that reads a frame from every playing source each 20 ms,
+#                       the way nextcord's AudioPlayer threads would
+#   FakeAudioSource, FakeVoiceClient, FakeGuild, FakeInteraction - what the commands touch
+#
+# Video IDs are 11 characters like real ones. Playlist IDs encode their length
+# (PLbench<length>), so no state is shared between the fakes.
+
+import asyncio
+import random
+import re
+import threading
+import time
+import types
+
+import nextcord
+from aiohttp import web
+
+FRAME_SECONDS = 0.02
+PCM_FRAME = b'\x00' * 3840  # 20 ms of 48 kHz stereo s16le
+OPUS_FRAME = b'\xf8\xff\xfe'  # an Opus packet of silence
+
+
+def video_id(index):
+    return f"v{index:010d}"
+
+
+def playlist_length(playlist_id):
+    match = re.match(r'PLbench(\d+)', playlist_id or '')
+    return int(match.group(1)) if match else 0
+
+
+def _sleep_latency(latency, jitter):
+    if latency > 0:
+        time.sleep(max(0.0, random.gauss(latency, latency * jitter)))
+
+
+# -- yt_dlp -------------------------------------------------------------------------------
+
+class _YoutubeDLError(Exception):
+    pass
+
+
+class _YoutubeDL:
+    latency = 0.3  # seconds per extract_info call, set by make_fake_yt_dlp
+    jitter = 0.2
+    track_seconds = 2.0
+    calls = 0  # extract_info calls made, across all instances
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def extract_info(self, url, download=False):
+        _YoutubeDL.calls += 1
+        _sleep_latency(self.latency, self.jitter)
+
+        playlist = re.search(r'list=([\w-]+)', url)
+        if playlist and self.params.get('extract_flat'):
+            start = self.params.get('playliststart', 1) - 1
+            end = min(self.params.get('playlistend') or playlist_length(playlist.group(1)), playlist_length(playlist.group(1)))
+            return {
+                'title': f"Benchmark playlist {playlist.group(1)}",
+                'entries': [{'id': video_id(i), 'title': f"Track {i}", 'duration': self.track_seconds} for i in range(start, end)],
+            }
+
+        match = re.search(r'v=([\w-]{11})', url)
+        if not match:
+            raise _YoutubeDLError(f"Unsupported URL: {url}")
+        vid = match.group(1)
+        expire = int(time.time()) + 6 * 3600
+        return {
+            'id': vid,
+            'title': f"Track {vid}",
+            'duration': self.track_seconds,
+            'channel': 'Benchmark',
+            'acodec': 'opus',
+            'url': f"https://rr1.fake.googlevideo.com/videoplayback?id={vid}&itag=251&expire={expire}",
+            'formats': [
+                {'format_id': '249', 'acodec': 'opus', 'vcodec': 'none', 'abr': 50, 'protocol': 'https',
+                 'url': f"https://rr1.fake.googlevideo.com/videoplayback?id={vid}&itag=249&expire={expire}"},
+                {'format_id': '251', 'acodec': 'opus', 'vcodec': 'none', 'abr': 130, 'protocol': 'https',
+                 'url': f"https://rr1.fake.googlevideo.com/videoplayback?id={vid}&itag=251&expire={expire}"},
+                {'format_id': '140', 'acodec': 'mp4a.40.2', 'vcodec': 'none', 'abr': 129, 'protocol': 'https',
+                 'url': f"https://rr1.fake.googlevideo.com/videoplayback?id={vid}&itag=140&expire={expire}"},
+            ],
+        }
+
+    def sanitize_info(self, info_dict):
+        return info_dict
+
+    def prepare_filename(self, info_dict):
+        return f"{info_dict['id']}.webm"
+
+
+def make_fake_yt_dlp(latency=0.3, jitter=0.2, track_seconds=2.0):
+    # A module object to put in sys.modules['yt_dlp'] before the bot imports it
+    _YoutubeDL.latency = latency
+    _YoutubeDL.jitter = jitter
+    _YoutubeDL.track_seconds = track_seconds
+    module = types.ModuleType('yt_dlp')
+    module.YoutubeDL = _YoutubeDL
+    module.utils = types.SimpleNamespace(YoutubeDLError=_YoutubeDLError)
+    return module
+
+
+# -- YouTube Data API ---------------------------------------------------------------------
+
+class FakeDataAPI:
+    def __init__(self, latency=0.05, track_seconds=2.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.track_seconds = int(track_seconds)
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self):
+        threading.Thread(target=self._serve, name='fake-data-api', daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get('/videos', self.videos)
+        app.router.add_get('/search', self.search)
+        app.router.add_get('/playlists', self.playlists)
+        app.router.add_get('/playlistItems', self.playlist_items)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _respond(self, body):
+        self.requests += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return web.json_response(body)
+
+    def _video(self, vid):
+        return {
+            'id': vid,
+            'snippet': {'title': f"Track {vid}", 'channelTitle': 'Benchmark', 'thumbnails': {}},
+            'contentDetails': {'duration': f"PT{self.track_seconds}S"},
+        }
+
+    async def videos(self, request):
+        ids = [vid for vid in request.query.get('id', '').split(',') if vid]
+        return await self._respond({'items': [self._video(vid) for vid in ids]})
+
+    async def search(self, request):
+        count = int(request.query.get('maxResults', 5))
+        items = [{'id': {'videoId': video_id(i)}, 'snippet': {'title': f"Track {i}", 'channelTitle': 'Benchmark'}} for i in range(count)]
+        return await self._respond({'items': items})
+
+    async def playlists(self, request):
+        playlist_id = request.query.get('id')
+        length = playlist_length(playlist_id)
+        items = [{'id': playlist_id, 'snippet': {'title': f"Benchmark playlist {playlist_id}", 'channelTitle': 'Benchmark'},
+                  'contentDetails': {'itemCount': length}}] if length else []
+        return await self._respond({'items': items})
+
+    async def playlist_items(self, request):
+        length = playlist_length(request.query.get('playlistId'))
+        start = int(request.query.get('pageToken') or 0)
+        end = min(start + int(request.query.get('maxResults', 50)), length)
+        items = [{'snippet': {'title': f"Track {i}", 'position': i}, 'contentDetails': {'videoId': video_id(i)}} for i in range(start, end)]
+        body = {'items': items, 'pageInfo': {'totalResults': length}}
+        if end < length:
+            body['nextPageToken'] = str(end)
+        return await self._respond(body)
+
+
+# -- Voice --------------------------------------------------------------------------------
+
+class FakeAudioSource(nextcord.AudioSource):
+    # Stands in for the ffmpeg source: `frames` frames of silence
+    def __init__(self, frames, opus=True):
+        self.remaining = frames
+        self.opus = opus
+        self.frame = OPUS_FRAME if opus else PCM_FRAME
+
+    def read(self):
+        if self.remaining <= 0:
+            return b''
+        self.remaining -= 1
+        return self.frame
+
+    def is_opus(self):
+        return self.opus
+
+    def cleanup(self):
+        self.remaining = 0
+
+
+class FakeVoiceBackend:
+    # Plays every active source in real time from one thread
+    def __init__(self):
+        self._playing = {}  # FakeVoiceClient -> (source, after)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.frames = 0
+        self.late_ticks = 0  # ticks that took longer than a frame: the fake itself fell behind
+        threading.Thread(target=self._run, name='fake-voice', daemon=True).start()
+
+    def play(self, client, source, after):
+        with self._lock:
+            self._playing[client] = (source, after)
+
+    def stop(self, client):
+        with self._lock:
+            playing = self._playing.pop(client, None)
+        if playing is not None:
+            self._finish(*playing)
+
+    def is_playing(self, client):
+        return client in self._playing
+
+    def close(self):
+        self._stop.set()
+
+    def _finish(self, source, after):
+        source.cleanup()
+        if after is not None:
+            after(None)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            with self._lock:
+                playing = list(self._playing.items())
+            finished = []
+            for client, (source, after) in playing:
+                if source.read():
+                    self.frames += 1
+                else:
+                    finished.append(client)
+            for client in finished:
+                with self._lock:
+                    done = self._playing.pop(client, None)
+                if done is not None:
+                    self._finish(*done)
+
+            next_tick += FRAME_SECONDS
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+                next_tick = time.monotonic()
+
+
+class FakeVoiceClient:
+    def __init__(self, backend, channel):
+        self.backend = backend
+        self.channel = channel
+        self.guild = channel.guild
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def is_playing(self):
+        return self.backend.is_playing(self)
+
+    def play(self, source, after=None):
+        self.backend.play(self, source, after)
+
+    def stop(self):
+        self.backend.stop(self)
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    async def disconnect(self, force=False):
+        self.stop()
+        self.connected = False
+        self.guild.voice_client = None
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild, backend, connect_latency=0.01, bitrate=64000):
+        self.guild = guild
+        self.backend = backend
+        self.connect_latency = connect_latency
+        self.bitrate = bitrate
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_latency)
+        client = FakeVoiceClient(self.backend, self)
+        self.guild.voice_client = client
+        return client
+
+
+class FakeGuild:
+    def __init__(self, guild_id, backend, connect_latency=0.01):
+        self.id = guild_id
+        self.name = f"Guild {guild_id}"
+        self.voice_client = None
+        self.voice_channel = FakeVoiceChannel(self, backend, connect_latency)
+
+    async def change_voice_state(self, channel=None, self_deaf=False, self_mute=False):
+        pass
+
+
+class FakeUser:
+    def __init__(self, user_id, guild):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.avatar = types.SimpleNamespace(url='https://cdn.discordapp.com/embed/avatars/0.png')
+        self.guild = guild
+        self.voice = types.SimpleNamespace(channel=guild.voice_channel)
+
+
+class FakeInteraction:
+    # What the slash command handlers read from the interaction; replies are counted, not sent
+    def __init__(self, guild, user):
+        self.guild = guild
+        self.user = user
+        self.replies = 0
+        self.deferred = False
+        self.followup = self
+        self.response = self
+
+    async def send(self, content=None, **kwargs):
+        self.replies += 1
+
+    async def send_message(self, content=None, **kwargs):
+        self.replies += 1
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+    def is_done(self):
+        return self.deferred
+
+    async def edit_original_message(self, **kwargs):
+        self.replies += 1
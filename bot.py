@@ -2,70 +2,336 @@ import nextcord
 from nextcord import Interaction, SlashOption
 from nextcord.ext import commands
 from nextcord import Game
-import yt_dlp
 import asyncio
-from collections import deque
+from itertools import islice
 import re
-from googleapiclient.discovery import build
 import validators
 import json
-import colorama
 from datetime import datetime
 import logging 
-from asyncio import Semaphore
-
-colorama.init(autoreset=True)
-
-# Configure logging
-logging.basicConfig(
-    filename='bot.log',  # Specify the log file
-    level=logging.INFO,  # Set the logging level
-    format='%(asctime)s [%(levelname)s] - %(message)s',
-)
+from executor import ExtractionError, ExtractionExecutor, ExtractionTimeout
+from metadata_cache import MetadataCache, metadata_from_info_dict
+from youtube_api import QuotaExceeded, YouTubeAPI
+from quota import QuotaScheduler
+from stream_cache import StreamCache
+from prefetch import Prefetcher
+from audio_cache import AudioCache
+from formats import FormatSelector, audio_codec
+from fanout import FanoutHub
+from queue_view import QueueView
+from player import PlayerRegistry, QueueEntry
+from concurrency import FairLimiter, SingleFlight, current_guild_id, current_track_id
+from logconfig import setup_logging
+from persistence import QueueStore
+from ipc import WorkerIPC
+import metrics
+from profiler import LoopWatchdog, SamplingProfiler
+import os
+import tempfile
+import threading
+import time
+import weakref
 
 # Load configuration from config.json
 with open('config.json', 'r') as config_file:
     config_data = json.load(config_file)
 
-class Bot(commands.Bot):
+# Set by launcher.py when the bot runs as one of several worker processes
+WORKER_ID = int(os.environ.get('PIKATUNES_WORKER_ID', 0))
+WORKER_COUNT = int(os.environ.get('PIKATUNES_WORKER_COUNT', 1))
+SHARD_IDS = [int(shard_id) for shard_id in os.environ['PIKATUNES_SHARD_IDS'].split(',')] if os.environ.get('PIKATUNES_SHARD_IDS') else None
+SHARD_COUNT = int(os.environ['PIKATUNES_SHARD_COUNT']) if os.environ.get('PIKATUNES_SHARD_COUNT') else config_data.get('shard_count')
+IPC_PORT = int(os.environ['PIKATUNES_IPC_PORT']) if os.environ.get('PIKATUNES_IPC_PORT') else config_data.get('ipc_port', 47100)
+
+# JSON lines written by a background thread; each worker process gets its own rotating file
+log_path = config_data.get('log_path', 'bot.log')
+if WORKER_COUNT > 1:
+    log_root, log_ext = os.path.splitext(log_path)
+    log_path = f"{log_root}.worker{WORKER_ID}{log_ext}"
+setup_logging(
+    path=log_path,
+    level=config_data.get('log_level', 'INFO'),
+    max_bytes=int(config_data.get('log_max_mb', 50) * 1024 ** 2),
+    backup_count=config_data.get('log_backup_count', 5),
+    console=config_data.get('log_console', True),
+    worker_id=WORKER_ID if WORKER_COUNT > 1 else None,
+    sample_burst=config_data.get('log_sample_burst', 10),
+    sample_every=config_data.get('log_sample_every', 100),
+    sample_window=config_data.get('log_sample_window', 60),
+)
+
+# Songs per /queue page
+QUEUE_PAGE_SIZE = config_data.get('queue_page_size', 10)
+
+# Receives /reportanerror reports and is the only user allowed to run /profile
+OWNER_USER_ID = 820062277842632744
+
+class Bot(commands.AutoShardedBot):
     def __init__(self, command_prefix, intents):
-        super().__init__(command_prefix=command_prefix, intents=intents)
+        # Without the launcher this process runs every shard (Discord's recommended count unless shard_count is set)
+        shard_options = {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS if SHARD_COUNT else None}
+        if WORKER_ID != 0:
+            # Only the first worker syncs slash commands with Discord
+            shard_options.update(rollout_register_new=False, rollout_update_known=False, rollout_delete_unknown=False)
+        super().__init__(command_prefix=command_prefix, intents=intents, **shard_options)
         self.YOUTUBE_API_KEY = config_data.get('youtube_api_key')
-        self.youtube = build('youtube', 'v3', developerKey=self.YOUTUBE_API_KEY)
+        # Async Data API client on a pooled keep-alive session; the limiter keeps guilds fair
+        self.youtube = YouTubeAPI(
+            self.YOUTUBE_API_KEY,
+            limiter=FairLimiter('api', config_data.get('api_concurrency', 8)),
+            # Unit budget; each worker process gets an equal share of the project's daily quota
+            quota=QuotaScheduler(
+                daily_quota=config_data.get('youtube_daily_quota', 10000) // WORKER_COUNT,
+                burst=config_data.get('youtube_quota_burst', 2000) // WORKER_COUNT,
+                reserve=config_data.get('youtube_quota_reserve', 500) // WORKER_COUNT,
+            ),
+            max_connections=config_data.get('api_max_connections', 20),
+            timeout=config_data.get('api_timeout', 15),
+            retries=config_data.get('api_retries', 3),
+        )
         self.ffmpeg_options = {
             'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
             'options': '-vn',
         }
-        self.server_data = {}  # Store server-specific data
-        self.is_playing_dict = {}  # Dictionary to track whether the bot is playing in each server
+        # Queues and now-playing state survive restarts; a guild is reloaded the next time it is used
+        self.queue_store = QueueStore(
+            path=config_data.get('queue_store_path', 'queues.sqlite3'),
+            flush_interval=config_data.get('queue_store_flush_interval', 1.0),
+            compact_interval=config_data.get('queue_store_compact_interval', 300),
+        )
+        # 'auto': Opus passthrough when the stream is already Opus; 'pcm': always transcode
+        self.audio_mode = config_data.get('audio_mode', 'auto')
+        self.players = PlayerRegistry(journal_for=self.queue_store.journal_for)  # GuildPlayer per guild: queue, voice client, playing state
         self.start_time = datetime.now()
-        
-    async def on_ready(self):
-        logging.info(f'Logged in as {self.user.name} (ID: {self.user.id})')
-        logging.info(f'Connected to {len(self.guilds)} guilds:')
-        logging.info('+' + '-' * 42 + '+')
 
-        for guild in self.guilds:
-            guild_id = guild.id
-            print(colorama.Fore.GREEN + f'| Guild: {guild.name.ljust(30)} |')
-            print(colorama.Fore.GREEN + f'| ID: {str(guild_id).ljust(30)} |')
-            print(colorama.Fore.GREEN + f'| Members: {str(guild.member_count).ljust(26)} |')
-            print(colorama.Fore.BLUE + '+' + '-'*42 + '+')
+        # Lets /stats in any worker process see the others
+        self.ipc = WorkerIPC(WORKER_ID, WORKER_COUNT, self.collect_stats, base_port=IPC_PORT) if WORKER_COUNT > 1 else None
+
+        # All blocking yt_dlp calls go through this executor
+        self.extractor = ExtractionExecutor(
+            max_workers=config_data.get('extraction_workers', 4),
+            use_processes=config_data.get('extraction_use_processes', False),
+            default_timeout=config_data.get('extraction_timeout', 60),
+            # Audio cache downloads run on threads of their own, outside the extraction slots
+            download_workers=config_data.get('audio_cache_max_downloads', 2),
+        )
+
+        # Concurrent identical yt_dlp / Data API requests (a link many guilds play at once) share one call
+        self.single_flight = SingleFlight()
+
+        # Voice gateway connects are slow and rate limited, so only a few run at once
+        self.voice_limiter = FairLimiter('voice_connect', config_data.get('voice_connect_concurrency', 5))
 
-            # Initialize server-specific data for each guild
-            if guild_id not in self.server_data:
-                self.server_data[guild_id] = {'queue': deque(), 'is_playing': False}
+        # Title / duration / channel / thumbnail per video ID (memory LRU + SQLite)
+        self.metadata_cache = MetadataCache(
+            path=config_data.get('metadata_cache_path', 'metadata_cache.sqlite3'),
+            max_entries=config_data.get('metadata_cache_size', 10000),
+            ttl=config_data.get('metadata_cache_ttl', 7 * 24 * 3600),
+        )
 
-            # Initialize is_playing_dict for each guild
-            if guild_id not in self.is_playing_dict:
-                self.is_playing_dict[guild_id] = False
+        # Resolved googlevideo stream URLs, reused until shortly before their expire= timestamp
+        self.stream_cache = StreamCache(
+            max_entries=config_data.get('stream_cache_size', 2000),
+            safety_margin=config_data.get('stream_cache_safety_margin', 120),
+        )
 
-        print(colorama.Fore.GREEN + f'Total Guild Count: {len(self.guilds)}')
-        print(colorama.Fore.GREEN + f'Invite link: https://discord.com/oauth2/authorize?client_id={self.user.id}&scope=bot&permissions=36719616')
+        # Resolves the next queue entries while the current song plays
+        self.prefetcher = Prefetcher(
+            self.prefetch_stream,
+            depth=config_data.get('prefetch_depth', 2),
+            max_in_flight=config_data.get('prefetch_max_in_flight', 32),
+            safety_margin=config_data.get('stream_cache_safety_margin', 120),
+        )
+
+        # Chooses the audio stream closest to the voice channel's bitrate
+        self.format_selector = FormatSelector(
+            policy=config_data.get('audio_format_policy', 'codec'),
+            codecs=config_data.get('audio_format_codecs', ['opus', 'mp4a', 'vorbis']),
+        )
+
+        # Optional shared decode: guilds starting the same track within a few seconds share one ffmpeg
+        self.fanout = FanoutHub(
+            window=config_data.get('fanout_window', 5.0),
+            buffer_seconds=config_data.get('fanout_buffer_seconds', 10.0),
+        ) if config_data.get('fanout_enabled', False) else None
+
+        # Optional local copies of often played tracks, played from disk instead of streamed.
+        # Each worker process keeps its own subdirectory and an equal share of the size budget,
+        # so workers never evict (or download over) each other's files.
+        audio_cache_dir = config_data.get('audio_cache_dir', 'audio_cache')
+        if WORKER_COUNT > 1:
+            audio_cache_dir = os.path.join(audio_cache_dir, f"worker{WORKER_ID}")
+        self.audio_cache = AudioCache(
+            self.download_audio,
+            directory=audio_cache_dir,
+            max_bytes=int(config_data.get('audio_cache_max_gb', 5) * 1024 ** 3) // WORKER_COUNT,
+            min_plays=config_data.get('audio_cache_min_plays', 3),
+            max_downloads=config_data.get('audio_cache_max_downloads', 2),
+        ) if config_data.get('audio_cache_enabled', False) else None
+
+        # Prometheus metrics on localhost; gauges are computed when scraped, not kept up to date
+        self.ffmpeg_sources = weakref.WeakSet()  # every ffmpeg AudioSource created, for the process gauge
+        metrics.voice_clients.func = lambda: sum(1 for player in self.players if player.is_connected)
+        metrics.ffmpeg_processes.func = self.count_ffmpeg_processes
+        metrics.queue_length.func = lambda: sum(len(player.queue) for player in self.players)
+        self.metrics_runner = None
+
+        # Logs the stack of whatever blocks the event loop for longer than the threshold
+        self.watchdog = LoopWatchdog(
+            interval=config_data.get('watchdog_interval', 0.1),
+            threshold=config_data.get('watchdog_threshold', 0.5),
+        )
+        self.watchdog_task = None
+        self.profiler = None  # SamplingProfiler while /profile is running
+        self.profiler_task = None
+
+    async def start(self, *args, **kwargs):
+        # Only starts the flush / compaction tasks; no guild state is read here
+        self.queue_store.start()
+        if self.audio_cache:
+            await self.audio_cache.start()
+        if self.ipc:
+            await self.ipc.start()
+        if config_data.get('metrics_enabled', True):
+            try:
+                # One port per worker process
+                self.metrics_runner = await metrics.start_metrics_server(
+                    host=config_data.get('metrics_host', '127.0.0.1'),
+                    port=config_data.get('metrics_port', 9464) + WORKER_ID,
+                )
+            except OSError as e:
+                logging.error(f"Metrics endpoint could not be started: {e}")
+        self.watchdog_task = asyncio.create_task(self.watchdog.run())
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        if self.ipc:
+            await self.ipc.close()
+        if self.watchdog_task:
+            self.watchdog_task.cancel()
+        if self.profiler and self.profiler.running:
+            self.profiler.stop()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        await self.queue_store.close()
+        await self.youtube.close()
+        if self.audio_cache:
+            self.audio_cache.close()
+        self.extractor.shutdown()
+        self.metadata_cache.close()
+        await super().close()
+
+    async def warm_up(self):
+        # Import yt_dlp on a worker thread once we are connected, so the first /play does not pay for it
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, __import__, 'yt_dlp')
+        except Exception as e:
+            logging.error(f"Warm-up failed: {e}")
+
+    def collect_stats(self):
+        # What this process reports to /stats, locally and over IPC
+        return {
+            'worker_id': WORKER_ID,
+            'shard_ids': sorted(self.shards),
+            'guilds': len(self.guilds),
+            'players': len(self.players),
+            'started': self.start_time.timestamp(),
+        }
+
+    def start_profiler(self, seconds, on_done):
+        # Samples the event loop for `seconds`, then writes the report and awaits on_done(profiler, path)
+        if self.profiler:
+            return False
+        self.profiler = SamplingProfiler(self.watchdog.thread_id or threading.get_ident(), interval=config_data.get('profile_interval', 0.01))
+        self.profiler.start()
+        self.profiler_task = asyncio.create_task(self.finish_profile(seconds, on_done))
+        return True
+
+    async def finish_profile(self, seconds, on_done):
+        await asyncio.sleep(seconds)
+        profiler, path = await self.stop_profiler()
+        await on_done(profiler, path)
+
+    async def stop_profiler(self):
+        # Returns (profiler, report path), or (None, None) when nothing was running
+        profiler = self.profiler
+        if not profiler or not profiler.running:
+            return None, None
+        self.profiler = None
+        if self.profiler_task and self.profiler_task is not asyncio.current_task():
+            self.profiler_task.cancel()
+        self.profiler_task = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, profiler.stop)
+        path = os.path.join(
+            config_data.get('profile_dir', 'profiles'),
+            f"loop-{datetime.now():%Y%m%d-%H%M%S}-worker{WORKER_ID}.collapsed",
+        )
+        await loop.run_in_executor(None, profiler.write, path)
+        logging.info(f"Profile written to {path}: {profiler.samples} samples, {profiler.idle} idle")
+        return profiler, path
+
+    def count_ffmpeg_processes(self):
+        # Sources whose ffmpeg has been started and has not exited yet
+        count = 0
+        for source in list(self.ffmpeg_sources):
+            process = getattr(source, '_process', None)
+            if process is not None and getattr(process, 'poll', None) and process.poll() is None:
+                count += 1
+        return count
+
+    async def gather_stats(self):
+        # Per-process stats for the whole deployment; None for processes that did not answer
+        if self.ipc:
+            return await self.ipc.gather_stats()
+        return [self.collect_stats()]
+
+    async def get_player(self, guild_id, create=True):
+        # Registry lookup that rehydrates the guild's saved queue the first time it is used after a restart
+        player = self.players.get(guild_id)
+        if player is not None:
+            return player
+
+        state = await self.queue_store.load(guild_id)
+
+        # Another command may have created the player while we were reading
+        player = self.players.get(guild_id)
+        if player is not None or (state is None and not create):
+            return player
+
+        player = self.players.get_or_create(guild_id)
+        if state is not None:
+            entries, now_playing = state
+            # The song that was playing when the bot went down is played again first
+            if now_playing is not None:
+                entries = [now_playing] + entries
+
+            # Load without journaling each entry, then record the result as a single reset
+            journal, player.queue.journal = player.queue.journal, None
+            player.queue.extend(QueueEntry.from_record(record) for record in entries)
+            player.queue.journal = journal
+            player.queue.snapshot()
+            player.set_current_track(None)
+            logging.info(f"Restored {len(player.queue)} queued songs for guild {guild_id}")
+        return player
+        
+    async def on_ready(self):
+        logging.info(f'Logged in as {self.user.name} (ID: {self.user.id})')
+
+        # One summary instead of a block per guild, which meant thousands of console writes on big deployments
+        member_count = sum(guild.member_count or 0 for guild in self.guilds)
+        startup_time = (datetime.now() - self.start_time).total_seconds()
+        summary = f'Ready in {startup_time:.1f}s: {len(self.guilds)} guilds, {member_count} members, shards {sorted(self.shards)}'
+        logging.info(summary)
+        logging.info(f'Invite link: https://discord.com/oauth2/authorize?client_id={self.user.id}&scope=bot&permissions=36719616')
 
         # Set presence when the bot is ready
         await self.change_presence(activity=Game(name='MULTISERVER SUPPORT'))
 
+        asyncio.create_task(self.warm_up())
+
     async def on_command_error(self, ctx, error):
         if isinstance(error, commands.CommandError):
             logging.error(f"Command '{ctx.command.name}' failed: {error}")
@@ -77,61 +343,163 @@ class Bot(commands.Bot):
             logging.error(f"An error occurred: {error}")
 
         
-    async def get_playlist_info(self, playlist_url):
+    async def get_playlist_info(self, playlist_url, requester_id=None):
         playlist_id_match = re.search(r"list=([a-zA-Z0-9_-]+)", playlist_url)
         if playlist_id_match:
             playlist_id = playlist_id_match.group(1)
 
-            # Request to get playlist details
-            playlist_request = self.youtube.playlists().list(part="snippet", id=playlist_id)
             try:
-                playlist_response = playlist_request.execute()
-
-                if 'items' in playlist_response and playlist_response['items']:
-                    playlist_info = playlist_response['items'][0]['snippet']
-                    playlist_title = playlist_info['title']
+                # Request to get playlist details
+                try:
+                    playlist = await self.single_flight.do(('api_playlist', playlist_id), self.youtube.playlist, playlist_id)
+                except QuotaExceeded:
+                    # Out of API budget: read the playlist with yt_dlp instead
+                    self.youtube.quota.record_fallback()
+                    return await self.get_playlist_info_ytdl(playlist_id, requester_id)
+
+                if playlist:
+                    playlist_title = playlist.title
+                    item_count = playlist.item_count
+
+                    # Only the first page is fetched here; the rest streams in through 'remaining'
+                    pages = self.iter_playlist_pages(playlist_id, requester_id=requester_id)
+                    try:
+                        first_page = await pages.__anext__()
+                    except StopAsyncIteration:
+                        return None
 
-                    # Request to get playlist items
-                    items_request = self.youtube.playlistItems().list(part="contentDetails", playlistId=playlist_id, maxResults=50)
-                    items_response = items_request.execute()
+                    # Number of songs that will end up in the queue once every page is loaded
+                    song_count = min(item_count or len(first_page), config_data.get('max_playlist_size', 1000))
 
-                    if 'items' in items_response and items_response['items']:
-                        playlist_urls = [f"https://www.youtube.com/watch?v={item['contentDetails']['videoId']}" for item in items_response['items']]
-                        return {'title': playlist_title, 'videos': playlist_urls}
-                    else:
-                        return None
+                    return {'title': playlist_title, 'videos': first_page, 'remaining': pages, 'count': max(song_count, len(first_page))}
                 else:
                     return None
             except Exception as e:
-                print(f"Error fetching playlist information: {e}")
+                logging.error(f"Error fetching playlist information: {e}")
                 return None
 
         return None
 
+    async def iter_playlist_pages(self, playlist_id, max_items=None, requester_id=None):
+        # Follow nextPageToken and yield one page of QueueEntry records at a time
+        max_items = max_items or config_data.get('max_playlist_size', 1000)
+        page_token = None
+        fetched = 0
+
+        while fetched < max_items:
+            try:
+                max_results = min(50, max_items - fetched)
+                page = await self.single_flight.do(
+                    ('api_playlist_items', playlist_id, max_results, page_token),
+                    self.youtube.playlist_items, playlist_id, max_results, page_token,
+                )
+            except QuotaExceeded:
+                # Budget ran out part way through: load the rest with yt_dlp
+                self.youtube.quota.record_fallback()
+                _, playlist_entries = await self.extract_flat_playlist(playlist_id, start=fetched, max_items=max_items - fetched, requester_id=requester_id)
+                async for page_entries in self.iter_entry_pages(playlist_entries):
+                    yield page_entries
+                return
+
+            playlist_entries = [QueueEntry(video_id=item.video_id, title=item.title, requester_id=requester_id) for item in page.items]
+            if playlist_entries:
+                fetched += len(playlist_entries)
+                yield playlist_entries
+
+            page_token = page.next_page_token
+            if not page_token:
+                break
+
+    async def get_playlist_info_ytdl(self, playlist_id, requester_id=None):
+        # Same result as get_playlist_info, from one yt_dlp flat-playlist extraction (no quota)
+        playlist_title, playlist_entries = await self.extract_flat_playlist(playlist_id, requester_id=requester_id)
+        if not playlist_entries:
+            return None
+        return {
+            'title': playlist_title or 'Playlist',
+            'videos': playlist_entries[:50],
+            'remaining': self.iter_entry_pages(playlist_entries[50:]),
+            'count': len(playlist_entries),
+        }
+
+    async def extract_flat_playlist(self, playlist_id, start=0, max_items=None, requester_id=None):
+        # IDs and titles only; yt_dlp does not resolve the individual videos with extract_flat
+        max_items = max_items or config_data.get('max_playlist_size', 1000)
+        # Shared between guilds loading the same playlist; the QueueEntry records below are built per caller
+        playlist_info = await self.single_flight.do(
+            ('flat_playlist', playlist_id, start, max_items),
+            self.extractor.extract_info,
+            f"https://www.youtube.com/playlist?list={playlist_id}",
+            {'quiet': True, 'extract_flat': 'in_playlist', 'playliststart': start + 1, 'playlistend': start + max_items},
+        )
+        playlist_entries = [
+            QueueEntry(video_id=entry['id'], title=entry.get('title'), duration=entry.get('duration'), requester_id=requester_id)
+            for entry in playlist_info.get('entries') or []
+            if entry and entry.get('id')
+        ]
+        return playlist_info.get('title'), playlist_entries
+
+    async def iter_entry_pages(self, entries, page_size=50):
+        # Already loaded entries, in the page shape ingest_playlist_pages expects
+        for i in range(0, len(entries), page_size):
+            yield entries[i:i + page_size]
+
+    async def ingest_playlist_pages(self, guild_id, pages):
+        # Append the remaining playlist pages to the queue as they arrive
+        try:
+            async for playlist_entries in pages:
+                player = self.players.get(guild_id)
+                if player is None:
+                    break
+                async with player.lock:
+                    player.queue.extend(playlist_entries)
+
+                # Restart the player if it already ran out of songs before this page arrived
+                if player.is_connected:
+                    await self.play_next_song(guild_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Error loading the rest of the playlist: {e}")
+        finally:
+            await pages.aclose()
+
+    def start_playlist_ingestion(self, guild_id, pages):
+        task = asyncio.create_task(self.ingest_playlist_pages(guild_id, pages))
+
+        # Keep track of the task so /stop can cancel it
+        ingest_tasks = self.players.get_or_create(guild_id).ingest_tasks
+        ingest_tasks.add(task)
+        task.add_done_callback(ingest_tasks.discard)
+
     async def search_music(self, query):
         try:
             # Call the YouTube API to search for videos
-            search_response = self.youtube.search().list(
-                q=query,
-                part='id,snippet',
-                maxResults=5,  # You can adjust this number based on your preference
-                type='video'
-            ).execute()
+            try:
+                results = await self.single_flight.do(('api_search', query, 5), self.youtube.search, query, 5)  # You can adjust this number based on your preference
+            except QuotaExceeded:
+                # Searches are the most expensive call, so they are the first to move to yt_dlp
+                self.youtube.quota.record_fallback()
+                return await self.search_music_ytdl(query, max_results=5)
 
             # Extract video information from the search results
-            search_results = []
-            for result in search_response.get('items', []):
-                video_id = result['id']['videoId']
-                video_url = f'https://www.youtube.com/watch?v={video_id}'
-                video_title = result['snippet']['title']
-                search_results.append({'title': video_title, 'url': video_url})
-
-            return search_results
+            return [{'title': result.title, 'url': result.url} for result in results]
 
         except Exception as e:
-            print(f"Error in search_music: {e}")
+            logging.error(f"Error in search_music: {e}")
             return []
 
+    async def search_music_ytdl(self, query, max_results=5):
+        search_info = await self.single_flight.do(
+            ('ytsearch', query, max_results),
+            self.extractor.extract_info, f"ytsearch{max_results}:{query}", {'quiet': True, 'extract_flat': True},
+        )
+        return [
+            {'title': entry.get('title'), 'url': f"https://www.youtube.com/watch?v={entry['id']}"}
+            for entry in search_info.get('entries') or []
+            if entry and entry.get('id')
+        ]
+
     def get_youtube_video_id(self, url):
         # Extract video ID from YouTube URL
         match = re.search(r"(?<=v=)[a-zA-Z0-9_-]+", url)
@@ -141,20 +509,19 @@ class Bot(commands.Bot):
             return None
             
     async def on_voice_state_update(self, member, before, after):
-        # Check if the bot is connected to the correct voice channel
+        # Only the bot's own voice state matters, and only in guilds it is playing in
         guild_id = member.guild.id
-        if self.voice_clients and member.guild == self.voice_clients[0].guild and not after.channel:
-            try:
-                # Reconnect to the voice channel and play the next song
-                asyncio.create_task(self.reconnect_to_voice_channel(guild_id))
-                await self.play_next_song(guild_id)
-            except Exception as e:
-                print(f"Error in on_voice_state_update: {e}")
+        player = self.players.get(guild_id)
+        if player is None or member.id != self.user.id:
+            return
 
         # Handle disconnects
         if before.channel and not after.channel:
-            # Reconnect if the bot was disconnected from the voice channel
-            asyncio.create_task(self.reconnect_to_voice_channel(guild_id))
+            try:
+                # Reconnect if the bot was disconnected from the voice channel
+                asyncio.create_task(self.reconnect_to_voice_channel(guild_id))
+            except Exception as e:
+                logging.error(f"Error in on_voice_state_update: {e}", extra={'guild_id': guild_id})
 
     async def send_embed_message(self, interaction, title, description, color):
         embed = nextcord.Embed(title=title, description=description, color=color)
@@ -165,11 +532,6 @@ class Bot(commands.Bot):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    async def on_song_end(self, guild_id):
-        self.is_playing_dict[guild_id] = False
-        # Use await when calling play_next_song
-        await self.play_next_song(self.voice_clients[0], guild_id)
-      
     async def get_video_info_playlist(self, url):
         # Check if the input is a valid URL
         if not validators.url(url):
@@ -182,8 +544,7 @@ class Bot(commands.Bot):
                 return None
 
         # Use yt_dlp to extract playlist information
-        ydl = yt_dlp.YoutubeDL({'quiet': True})
-        playlist_info = ydl.extract_info(url, download=False)
+        playlist_info = await self.single_flight.do(('info', url), self.extractor.extract_info, url, {'quiet': True})
 
         if 'entries' in playlist_info:
             # If it's a playlist, return the information for the first video
@@ -193,241 +554,429 @@ class Bot(commands.Bot):
 
     async def get_video_title(self, video_id_or_url):
         try:
-            info_dict = await self.get_video_info_single(video_id_or_url)
-            return info_dict.get('title', 'Unknown Title')
+            metadata = await self.get_track_metadata(video_id_or_url)
+            return (metadata or {}).get('title') or 'Unknown Title'
         except Exception as e:
-            print(f"Error in get_video_title: {e}")
+            logging.error(f"Error in get_video_title: {e}")
             return 'Unknown Title'
 
+    async def get_track_metadata(self, video_id_or_url):
+        # Read-through lookup: memory -> SQLite -> Data API -> yt_dlp
+        video_id = self.get_youtube_video_id(video_id_or_url) or video_id_or_url
+        metadata = (await self.get_track_metadata_batch([video_id])).get(video_id)
+        if metadata:
+            return metadata
+
+        # Fall back to yt_dlp (also seeds the cache through get_video_info_single)
+        url = video_id_or_url if re.match(r'https?://', video_id_or_url) else f"https://www.youtube.com/watch?v={video_id}"
+        info_dict = await self.get_video_info_single(url)
+        return metadata_from_info_dict(info_dict) if info_dict else None
+
+    async def get_track_metadata_batch(self, video_ids):
+        # Metadata for many videos at once: cache first, then one videos.list call per 50 uncached IDs
+        video_ids = [video_id for video_id in dict.fromkeys(video_ids) if video_id]
+        if not video_ids:
+            return {}
+
+        found = await self.metadata_cache.get_many(video_ids)
+        uncached = [video_id for video_id in video_ids if video_id not in found]
+        if not uncached:
+            return found
+
+        # The API accepts up to 50 IDs per request; run the chunks concurrently
+        chunks = [uncached[i:i + 50] for i in range(0, len(uncached), 50)]
+        responses = await asyncio.gather(
+            *(self.fetch_video_metadata_api(chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+
+        fetched = {}
+        fallback_ids = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, QuotaExceeded):
+                fallback_ids.extend(chunk)
+            elif isinstance(response, Exception):
+                logging.error(f"Error fetching metadata from the YouTube API: {response}")
+            else:
+                fetched.update(response)
+
+        if fetched:
+            await self.metadata_cache.put_many(fetched)
+            found.update(fetched)
+
+        if fallback_ids:
+            self.youtube.quota.record_fallback()
+            found.update(await self.fetch_video_metadata_ytdl(fallback_ids))
+        return found
+
+    async def fetch_video_metadata_ytdl(self, video_ids):
+        # Out of API budget: extract the videos with yt_dlp instead. Extractions still running after
+        # metadata_fallback_timeout keep going in the background and land in the cache for next time.
+        tasks = {
+            asyncio.create_task(self.get_video_info_single(f"https://www.youtube.com/watch?v={video_id}")): video_id
+            for video_id in video_ids
+        }
+        for task in tasks:
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        done, _ = await asyncio.wait(tasks, timeout=config_data.get('metadata_fallback_timeout', 2.0))
+
+        return {
+            tasks[task]: metadata_from_info_dict(task.result())
+            for task in done
+            if not task.cancelled() and not task.exception() and task.result()
+        }
+
+    async def fetch_video_metadata_api(self, video_ids):
+        videos = await self.single_flight.do(('api_videos', tuple(video_ids)), self.youtube.videos, video_ids)
+        return {video.video_id: video.metadata() for video in videos}
+
     async def get_search_results(self, query):
         ydl_opts = {
             'format': 'bestaudio/best',
             'outtmpl': "-",
             'quiet': True,
         }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            search_results = ydl.extract_info(query, download=False)
-
-            entries = search_results.get('entries', [])
 
-            if entries:
-                # Return a list of dictionaries containing URL and title for each video in the search results
-                results = [{'url': entry['formats'][0]['url'], 'title': entry['title']} for entry in entries]
-                return results
-            else:
-                return []
-
-    async def get_video_info_youtube_api(self, video_id):
-        # Use self.youtube instead of youtube
-        video_request = self.youtube.videos().list(part="snippet", id=video_id)
-        try:
-            video_response = video_request.execute()
+        search_results = await self.single_flight.do(('search_info', query), self.extractor.extract_info, query, ydl_opts)
 
-            if 'items' in video_response and video_response['items']:
-                return video_response['items'][0]['snippet']
-            else:
-                return None
-        except Exception as e:
-            print(f"Error in get_video_info_youtube_api: {e}")
-            return None
+        entries = search_results.get('entries', [])
 
-    async def get_current_song_title(self):
-        # Check if there is a voice client and it is playing
-        if self.voice_clients:
-            voice_client = self.voice_clients[0]  # Assuming there is only one voice client
+        if entries:
+            # Return a list of dictionaries containing URL and title for each video in the search results
+            target = self.target_bitrate()
+            results = []
+            for entry in entries:
+                chosen = self.format_selector.select(entry.get('formats'), target)
+                stream_url = chosen['url'] if chosen else entry.get('url')
+                if stream_url:
+                    results.append({'url': stream_url, 'title': entry['title'], 'acodec': audio_codec(chosen) if chosen else entry.get('acodec')})
+            return results
+        else:
+            return []
 
-            # Get the title of the currently playing song
-            current_song_title = "Unknown"
-            if voice_client.is_playing():
-                # Extract the info of the currently playing song
-                ydl = yt_dlp.YoutubeDL({'format': 'bestaudio/best', 'outtmpl': "-", 'quiet': True})
-                info_dict = ydl.extract_info(self.queue[0], download=False)
-                current_song_title = info_dict.get('title', 'Unknown')
+    async def on_song_end(self, guild_id, error=None, finished=None):
+        # Scheduled from the audio thread's `after` callback via run_coroutine_threadsafe
+        player = self.players.get(guild_id)
+        if player is not None:
+            player.is_playing = False
 
-            return current_song_title
-        else:
-            return "No song is currently playing."
+        if error:
+            logging.error(f"Player error: {error}", extra={'guild_id': guild_id})
 
-    async def on_song_end(self, guild_id):
-        self.server_data[guild_id]['is_playing'] = False
-        await self.play_next_song(guild_id)
+        # Wake the guild's player task
+        if finished is not None:
+            finished.set()
 
     async def get_voice_client(self, guild_id):
-        voice_channel = next((vc.channel for vc in self.voice_clients if vc.guild.id == guild_id), None)
+        player = self.players.get(guild_id)
 
-        if voice_channel:
+        if player and player.voice_client:
             # Check if the bot is already connected to the correct voice channel
-            if self.voice_clients and voice_channel == self.voice_clients[0].channel:
-                return self.voice_clients[0]
+            if player.is_connected:
+                return player.voice_client
             else:
                 try:
                     # Bot is not in the correct voice channel, reconnect
-                    voice_client = await voice_channel.connect()
-                    await voice_client.guild.change_voice_state(channel=voice_channel, self_deaf=True)
+                    voice_channel = player.voice_client.channel
+                    async with player.lock, self.voice_limiter.slot(guild_id):
+                        voice_client = await voice_channel.connect()
+                        await voice_client.guild.change_voice_state(channel=voice_channel, self_deaf=True)
+                        player.voice_client = voice_client
                     return voice_client
                 except nextcord.errors.ClientException:
                     # Bot is already connected to a voice channel
-                    print("Bot is already connected to a voice channel. Ignoring the reconnection.")
+                    logging.warning("Bot is already connected to a voice channel. Ignoring the reconnection.", extra={'guild_id': guild_id})
                     return None
         else:
-            print("Voice channel not found. Ignoring playback.")
+            logging.warning("Voice channel not found. Ignoring playback.", extra={'guild_id': guild_id})
             return None
             
     async def play_next_song(self, guild_id):
-        async with operation_semaphore:
-            if not self.voice_clients or not self.voice_clients[0].is_connected():
-                # If not connected, attempt to reconnect
-                await self.reconnect_to_voice_channel(guild_id)
-                # Return to avoid further execution until reconnection is complete
-                return
+        # Start the guild's player task unless it is already running
+        player = self.players.get_or_create(guild_id)
+        if player.player_task and not player.player_task.done():
+            return
+        player.player_task = asyncio.create_task(self.player_loop(guild_id))
 
-            # Get the voice client for the current guild
-            voice_client = next((vc for vc in self.voice_clients if vc.guild.id == guild_id), None)
+    async def player_loop(self, guild_id):
+        # One task per guild: plays the queue and sleeps on an Event between tracks instead of polling
+        current_guild_id.set(guild_id)
 
-            if not voice_client:
-                print("Bot is not in the correct voice channel. Ignoring the playback.")
-                return  # Return if not in the correct voice channel
+        # Get the player and voice client for the current guild
+        player = self.players.get_or_create(guild_id)
+        voice_client = player.voice_client
 
-            if voice_client.is_playing():
-                # Bot is already playing, don't start another song
-                return
+        if not voice_client or not voice_client.is_connected():
+            # If not connected, attempt to reconnect once this task has finished
+            asyncio.create_task(self.reconnect_to_voice_channel(guild_id))
+            return
+
+        if voice_client.is_playing():
+            # Bot is already playing, don't start another song
+            return
 
-            while self.server_data[guild_id]['queue']:
+        # Songs already re-resolved once after a 403, so a bad track cannot loop forever
+        refreshed_entries = set()
+
+        # When the previous track ended, for the inter-track gap metric
+        gap_start = None
+
+        while True:
+            async with player.lock:
+                if not player.queue:
+                    break
                 # Use deque's popleft() instead of list's pop(0)
-                next_song_url = self.server_data[guild_id]['queue'].popleft()
+                entry = player.queue.popleft()
+                # Only the first track after a /play counts towards play-to-first-frame
+                requested_at, player.requested_at = player.requested_at, None
+            # Log records from here on carry the track
+            current_track_id.set(entry.video_id)
 
-                if re.match(r'https?://', next_song_url):
-                    info_dict = await self.get_video_info_single(next_song_url)
+            try:
+                # Tracks kept in the audio cache play from disk without any extraction
+                local_path = self.audio_cache.get(entry.video_id) if self.audio_cache and entry.video_id else None
+                if local_path:
+                    resolved = entry
                 else:
-                    info_dict = await self.get_video_info_playlist(next_song_url)
-
-                try:
-                    if info_dict and 'formats' in info_dict and info_dict['formats']:
-                        audio_url = info_dict['formats'][0]['url']
-                        source = self.YTDLSource(info_dict, self.ffmpeg_options)  # Pass ffmpeg_options
+                    # Use the look-ahead result if the song was prefetched during the previous one
+                    resolved = await self.prefetcher.take(guild_id, entry)
+                    if not resolved:
+                        resolved = await self.resolve_stream(entry)
 
-                        # Check if the bot is still connected to the correct voice channel
-                        if voice_client and voice_client.is_connected():
-                            # Play the song
-                            voice_client.play(source.create_ffmpeg_player(), after=lambda e: self.on_song_end(guild_id))
+                if resolved and (local_path or entry.stream_url):
+                    # Opus input is sent as-is; anything else is decoded to PCM and encoded by the library
+                    passthrough = self.audio_mode == 'auto' and await self.probe_codec(entry, local_path) == 'opus'
+                    source = self.YTDLSource(entry, self.ffmpeg_options, local_path, passthrough, self.fanout, self.ffmpeg_sources)  # Pass ffmpeg_options
 
-                            # Update the is_playing status for the specific guild
-                            self.is_playing_dict[guild_id] = True
+                    # Set from the audio thread when the song ends, is skipped or fails
+                    finished = asyncio.Event()
 
-                            while voice_client.is_playing():
-                                await asyncio.sleep(1)
+                    async with player.lock:
+                        # The voice client may have been replaced by a reconnect while resolving
+                        voice_client = player.voice_client
 
-                        else:
-                            print("Bot is not in the correct voice channel. Ignoring the playback.")
+                        # Check if the bot is still connected to the correct voice channel
+                        if not voice_client or not voice_client.is_connected():
+                            logging.warning("Bot is not in the correct voice channel. Ignoring the playback.")
                             break  # Break the loop if not in the correct voice channel
-                    else:
-                        print("No valid audio URL found. Ignoring the playback.")
-                except yt_dlp.utils.ExtractorError as e:
-                    await self.handle_song_play_error(e, voice_client, guild_id)
-                except yt_dlp.utils.DownloadError as e:
-                    await self.handle_song_play_error(e, voice_client, guild_id)
-
-            # Use await when calling play_next_song
-            await self.reconnect_to_voice_channel(guild_id)
 
+                        # Play the song
+                        voice_client.play(
+                            metrics.FirstFrameTimer(
+                                source.create_ffmpeg_player(),
+                                lambda requested_at=requested_at, gap_start=gap_start: self.on_first_frame(requested_at, gap_start),
+                            ),
+                            after=lambda e, finished=finished: asyncio.run_coroutine_threadsafe(
+                                self.on_song_end(guild_id, e, finished), self.loop
+                            ),
+                        )
+
+                        # Update the playing state for the specific guild
+                        player.is_playing = True
+                        player.set_current_track(entry)
+
+                    if self.audio_cache:
+                        # Popular tracks get downloaded for next time
+                        self.audio_cache.record_play(entry.video_id)
+
+                    # Start resolving the upcoming songs while this one plays
+                    self.prefetcher.schedule(guild_id, player.queue)
+
+                    await finished.wait()
+                    gap_start = time.monotonic()
+                    player.set_current_track(None)
+
+                    if source.stream_forbidden() and entry not in refreshed_entries:
+                        # The cached stream URL went stale, resolve it again and retry
+                        logging.warning("Stream URL rejected with 403. Re-resolving the song.")
+                        refreshed_entries.add(entry)
+                        self.stream_cache.invalidate(entry.cache_key)
+                        entry.clear_stream()
+                        async with player.lock:
+                            player.queue.appendleft(entry)
+                else:
+                    logging.warning("No valid audio URL found. Ignoring the playback.")
+            except ExtractionError as e:
+                await self.handle_song_play_error(e, voice_client, guild_id)
+
+    def on_first_frame(self, requested_at, gap_start):
+        # Called from the audio thread when a track's first frame is read
+        now = time.monotonic()
+        if requested_at is not None:
+            metrics.play_to_first_frame_seconds.observe(now - requested_at)
+        if gap_start is not None:
+            metrics.inter_track_gap_seconds.observe(now - gap_start)
 
     async def handle_song_play_error(self, error, voice_client, guild_id):
         error_message = str(error)
-        print(f"Error during song playback: {error_message}")
 
-        if "Video unavailable" in error_message:
-            print("Video unavailable. Skipping to the next song.")
+        if isinstance(error, ExtractionTimeout):
+            error_type = 'timeout'
+        elif "Video unavailable" in error_message:
+            error_type = 'video_unavailable'
         elif "This video requires payment to watch" in error_message:
-            print("This video requires payment to watch. Skipping to the next song.")
+            error_type = 'payment_required'
         elif "This video is age-restricted" in error_message:
-            print("This video is age-restricted. Skipping to the next song.")
+            error_type = 'age_restricted'
         elif "Unable to extract video data" in error_message:
-            print("Unable to extract video data. Skipping to the next song.")
+            error_type = 'extraction_failed'
         else:
-            print("Unknown error. Skipping to the next song.")
+            error_type = 'unknown'
+        # Sampled per call site, so a run of broken tracks does not flood the log
+        logging.warning(f"Skipping to the next song ({error_type}): {error_message}", extra={'guild_id': guild_id})
+        metrics.playback_errors.inc(error_type)
 
-        # If there's an error, play the next song
-        await self.play_next_song(voice_client, guild_id)
+        # The guild's player task moves on to the next song by itself
 
     async def play_song(self, voice_client, song_url, guild_id):
-        global is_playing_dict
+        # Put the song at the front of the queue and let the guild's player task pick it up
+        self.players.get_or_create(guild_id).queue.appendleft(self.make_queue_entry(song_url))
+        await self.play_next_song(guild_id)
+
+    def make_queue_entry(self, song_url, requester_id=None):
+        return QueueEntry.from_url(song_url, video_id=self.get_youtube_video_id(song_url), requester_id=requester_id)
+
+    async def resolve_stream(self, entry):
+        # Fill in entry.stream_url, reusing a resolved stream URL until shortly before it expires
+        if entry.is_stream_fresh(self.stream_cache.safety_margin):
+            return entry
+
+        cached = self.stream_cache.get(entry.cache_key, entry.duration)
+        if cached:
+            entry.set_stream(*cached)
+            return entry
+
+        if re.match(r'https?://', entry.url):
+            info_dict = await self.get_video_info_single(entry.url)
+        else:
+            info_dict = await self.get_video_info_playlist(entry.url)
 
-        info_dict = self.get_video_info(song_url)
+        if not info_dict:
+            return None
 
+        # Pick the audio format matching the voice channel rather than whatever yt_dlp put at the top
+        chosen = self.format_selector.select(info_dict.get('formats'), self.target_bitrate())
+        stream_url = chosen['url'] if chosen else info_dict.get('url')
+        if not stream_url:
+            return None
+        codec = audio_codec(chosen) if chosen else info_dict.get('acodec')
+
+        # Reduce the extraction result to the entry right away; the info_dict is dropped here
+        entry.apply_info(info_dict)
+        entry.set_stream(*self.stream_cache.put(entry.cache_key, stream_url, codec))
+        return entry
+
+    def target_bitrate(self, guild_id=None):
+        # Bitrate (kbps) Discord actually sends in the guild's voice channel
+        voice_client = self.players.voice_client(guild_id or current_guild_id.get())
+        channel = getattr(voice_client, 'channel', None)
+        bitrate = getattr(channel, 'bitrate', None)
+        return bitrate / 1000 if bitrate else config_data.get('default_voice_bitrate', 64)
+
+    async def probe_codec(self, entry, local_path=None):
+        # Audio codec of what is about to play, so Opus can be passed through untouched
+        if local_path:
+            # bestaudio[ext=webm] downloads are always Opus
+            if os.path.splitext(local_path)[1] in ('.webm', '.opus'):
+                return 'opus'
+        elif entry.codec and entry.codec != 'none':
+            return entry.codec.split('.')[0]
+
+        # Unknown: ask ffprobe (or ffmpeg); probe() runs it on an executor thread itself
         try:
-            if info_dict and 'formats' in info_dict and info_dict['formats']:
-                audio_url = info_dict['formats'][0]['url']
-                source = self.YTDLSource(info_dict)
-                voice_client.play(source.create_ffmpeg_player(), after=lambda e: self.on_song_end(guild_id))
-                is_playing_dict[guild_id] = True
+            codec, _ = await asyncio.wait_for(
+                nextcord.FFmpegOpusAudio.probe(local_path or entry.stream_url, method='fallback'),
+                timeout=10,
+            )
+            return codec
+        except Exception as e:
+            logging.warning(f"Codec probe failed for {entry}: {e}")
+            return None
 
-                while voice_client.is_playing():
-                    await asyncio.sleep(1)
+    async def prefetch_stream(self, entry):
+        # Nothing to resolve ahead of time for tracks that will play from the audio cache
+        if self.audio_cache and entry.video_id in self.audio_cache:
+            return None
+        return await self.resolve_stream(entry)
 
-                # Use await when calling play_next_song
-                await self.play_next_song(voice_client, guild_id)
-            else:
-                print("No audio formats found for the provided URL.")
-        except yt_dlp.utils.ExtractorError as e:
-            await self.handle_song_play_error(e, voice_client, guild_id)
-        except yt_dlp.utils.DownloadError as e:
-            await self.handle_song_play_error(e, voice_client, guild_id)
+    async def download_audio(self, video_id):
+        # Runs on the executor's download threads, so a long download never holds an extraction slot
+        ydl_opts = {
+            'format': 'bestaudio[ext=webm]/bestaudio',
+            'outtmpl': os.path.join(self.audio_cache.directory, '%(id)s.%(ext)s'),
+            'quiet': True,
+            'noprogress': True,
+        }
+        return await self.extractor.download(f"https://www.youtube.com/watch?v={video_id}", ydl_opts, timeout=config_data.get('audio_cache_download_timeout', 600))
 
     async def get_video_info_single(self, url):
-        ydl = yt_dlp.YoutubeDL({'format': 'bestaudio/best', 'outtmpl': "-", 'quiet': True})
-        info_dict = ydl.extract_info(url, download=False)
+        # Guilds starting the same video at the same time share one extraction (and one cache write)
+        return await self.single_flight.do(('video', self.get_youtube_video_id(url) or url), self.extract_video_info, url)
+
+    async def extract_video_info(self, url):
+        info_dict = await self.extractor.extract_info(url, {'format': 'bestaudio/best', 'outtmpl': "-", 'quiet': True})
 
         if 'formats' in info_dict and info_dict['formats']:
+            # Every full extraction refreshes the metadata cache for free
+            if info_dict.get('id'):
+                await self.metadata_cache.put(info_dict['id'], metadata_from_info_dict(info_dict))
             return info_dict
         else:
             return None
 
     async def get_current_song_title(self, guild_id):
         # Check if there is a voice client and it is playing
-        if self.voice_clients:
-            voice_client = next((vc for vc in self.voice_clients if vc.guild.id == guild_id), None)
+        player = self.players.get(guild_id)
+        if player and player.voice_client:
+            voice_client = player.voice_client
 
             # Get the title of the currently playing song
             current_song_title = "Unknown"
-            if voice_client and voice_client.is_playing() and guild_id in self.server_data and 'queue' in self.server_data[guild_id]:
-                # Extract the info of the currently playing song
-                ydl = yt_dlp.YoutubeDL({'format': 'bestaudio/best', 'outtmpl': "-", 'quiet': True})
-                info_dict = ydl.extract_info(self.server_data[guild_id]['queue'][0], download=False)
-                current_song_title = info_dict.get('title', 'Unknown')
+            if voice_client.is_playing() and player.current_track:
+                # Look up the title of the currently playing song
+                current_song_title = player.current_track.title
+                if not current_song_title:
+                    metadata = await self.get_track_metadata(player.current_track.url)
+                    current_song_title = (metadata or {}).get('title') or 'Unknown'
 
             return current_song_title
         else:
             return "No song is currently playing."
 
-    async def get_queue_embed(self, guild_id, user):
+    def queue_page_count(self, guild_id):
+        player = self.players.get(guild_id)
+        queue_length = len(player.queue) if player else 0
+        return max(1, -(-queue_length // QUEUE_PAGE_SIZE))
+
+    async def get_queue_embed(self, guild_id, user, page=0):
         queue_embed = nextcord.Embed(
             title=f"Queue for {self.get_guild(guild_id).name}",
             color=0x3498db
         )
 
-        if guild_id in self.server_data and 'queue' in self.server_data[guild_id]:
-            queue = self.server_data[guild_id]['queue']
-            max_fields = 24
+        player = self.players.get(guild_id)
+        if player and player.queue:
+            queue = player.queue
+            page = max(0, min(page, self.queue_page_count(guild_id) - 1))
+            start = page * QUEUE_PAGE_SIZE
+
+            # Resolve only the visible titles, in one batched lookup (metadata cache first)
+            visible_entries = list(islice(queue, start, start + QUEUE_PAGE_SIZE))
+            titles = await self.get_track_metadata_batch([entry.video_id for entry in visible_entries if not entry.title])
 
-            # Inside the for loop where fields are added to the embed
             queue_list = []
-            for i, song_url in enumerate(queue, start=1):
-                if i <= max_fields:
-                    video_id = self.get_youtube_video_id(song_url)
-                    if video_id:
-                        info_dict = await self.get_video_info_youtube_api(video_id)
-                        title = info_dict.get('title', 'Unknown')
-                        queue_list.append(f"{i}. [{title}]({song_url})")
-                    else:
-                        queue_list.append(f"{i}. Unknown Video - [{song_url}]({song_url})")
+            for i, entry in enumerate(visible_entries, start=start + 1):
+                if entry.video_id:
+                    if not entry.title and titles.get(entry.video_id, {}).get('title'):
+                        # Remembered on the entry so the page is free to draw again
+                        entry.title = titles[entry.video_id]['title']
+                    queue_list.append(f"{i}. [{entry.title or 'Unknown'}]({entry.url})")
                 else:
-                    remaining_songs = len(queue) - max_fields
-                    queue_list.append(f"... and {remaining_songs} more. Use `/queue` to view the complete queue.")
-                    break
+                    queue_list.append(f"{i}. Unknown Video - [{entry.url}]({entry.url})")
 
             # Combine the queue list into a string and set it as the description
             queue_embed.description = "\n".join(queue_list)
+            queue_embed.set_footer(text=f"Page {page + 1}/{self.queue_page_count(guild_id)} · {len(queue)} songs")
 
         else:
             queue_embed.description = "The queue is currently empty."
@@ -438,8 +987,9 @@ class Bot(commands.Bot):
         return queue_embed
 
     async def add_to_queue(self, guild_id, song_url):
-        if guild_id in self.server_data and 'queue' in self.server_data[guild_id]:
-            self.server_data[guild_id]['queue'].append(song_url)
+        player = self.players.get(guild_id)
+        if player is not None:
+            player.queue.append(self.make_queue_entry(song_url))
             return True
         else:
             return False
@@ -447,6 +997,7 @@ class Bot(commands.Bot):
     async def play(self, ctx, url: str = None):
         user = ctx.user
         guild_id = ctx.guild.id
+        current_guild_id.set(guild_id)
 
         if not user.voice or not user.voice.channel:
             await ctx.send("You need to be in a voice channel to use this command.")
@@ -458,129 +1009,189 @@ class Bot(commands.Bot):
             return
 
         voice_channel = user.voice.channel
-
-        if guild_id not in self.server_data:
-            self.server_data[guild_id] = {'queue': deque(), 'is_playing': False}
-            self.is_playing_dict[guild_id] = False
+        player = await self.get_player(guild_id)
+        if not player.is_playing and player.requested_at is None:
+            player.requested_at = time.monotonic()
 
         # Check if the bot is already connected to a voice channel
         if not user.guild.voice_client:
             try:
-                voice_client = await asyncio.wait_for(voice_channel.connect(), timeout=120)
+                async with player.lock:
+                    # Another /play may have connected while we waited for the lock
+                    voice_client = user.guild.voice_client
+                    if not voice_client:
+                        async with self.voice_limiter.slot(guild_id):
+                            voice_client = await asyncio.wait_for(voice_channel.connect(), timeout=120)
 
-                # Deafen the bot when it joins
-                await voice_client.guild.change_voice_state(channel=voice_channel, self_deaf=True)
+                            # Deafen the bot when it joins
+                            await voice_client.guild.change_voice_state(channel=voice_channel, self_deaf=True)
+                    player.voice_client = voice_client
 
-                playlist_info = await bot.get_playlist_info(url)
+                playlist_info = await self.get_playlist_info(url, requester_id=user.id)
 
                 if playlist_info:
                     # Playlist detected
-                    playlist_urls = playlist_info['videos']
-                    self.server_data[guild_id]['queue'] = deque(self.server_data[guild_id]['queue']) + deque(playlist_urls)
+                    playlist_entries = playlist_info['videos']
+                    async with player.lock:
+                        player.queue.extend(playlist_entries)
+
+                    # Playback starts on the first page; the rest is appended in the background
+                    self.start_playlist_ingestion(guild_id, playlist_info['remaining'])
 
                     title = "Added to Queue"
-                    description = f"{len(playlist_urls)} songs added from [{playlist_info['title']}]({url})"
+                    description = f"{playlist_info['count']} songs added from [{playlist_info['title']}]({url})"
                 else:
                     # Single song provided
-                    self.server_data[guild_id]['queue'] = deque(self.server_data[guild_id]['queue'])
-                    self.server_data[guild_id]['queue'].appendleft(url)
+                    entry = self.make_queue_entry(url, requester_id=user.id)
+                    async with player.lock:
+                        player.queue.appendleft(entry)
 
                     title = "Added to Queue"
-                    description = f"[{await self.get_video_title(self.server_data[guild_id]['queue'][0])}]({url})"
+                    description = f"[{await self.get_video_title(url)}]({url})"
 
                 embed = nextcord.Embed(title=title, description=description, color=0x00ff00)
                 embed.set_author(name=user.name, icon_url=user.avatar.url)
 
                 await ctx.send(embed=embed)
 
-                if not self.is_playing_dict[guild_id] and self.server_data[guild_id]['queue']:
+                if not player.is_playing and player.queue:
                     await self.play_next_song(guild_id)
 
             except asyncio.TimeoutError:
+                player.requested_at = None
                 await ctx.send("Unable to connect to the voice channel. Connection timed out.")
         else:
             # Bot is already connected, add the song or playlist to the queue
-            playlist_info = await self.get_playlist_info(url)
+            if player.voice_client is None:
+                player.voice_client = user.guild.voice_client
+
+            playlist_info = await self.get_playlist_info(url, requester_id=user.id)
 
             if playlist_info:
-                playlist_urls = playlist_info['videos']
-                self.server_data[guild_id]['queue'] = deque(self.server_data[guild_id]['queue']) + deque(playlist_urls)
+                playlist_entries = playlist_info['videos']
+                async with player.lock:
+                    player.queue.extend(playlist_entries)
+
+                # Append the remaining pages in the background
+                self.start_playlist_ingestion(guild_id, playlist_info['remaining'])
 
                 title = "Added to Queue"
-                description = f"{len(playlist_urls)} songs added from [{playlist_info['title']}]({url})"
+                description = f"{playlist_info['count']} songs added from [{playlist_info['title']}]({url})"
             else:
-                self.server_data[guild_id]['queue'] = deque(self.server_data[guild_id]['queue'])
-                self.server_data[guild_id]['queue'].appendleft(url)
+                entry = self.make_queue_entry(url, requester_id=user.id)
+                async with player.lock:
+                    player.queue.appendleft(entry)
 
                 title = "Added to Queue"
-                description = f"[{await self.get_video_title(self.server_data[guild_id]['queue'][0])}]({url})"
+                description = f"[{await self.get_video_title(url)}]({url})"
 
             embed = nextcord.Embed(title=title, description=description, color=0x00ff00)
             embed.set_author(name=user.name, icon_url=user.avatar.url)
 
             await ctx.send(embed=embed)
 
-            if not self.is_playing_dict[guild_id] and self.server_data[guild_id]['queue']:
+            if player.is_playing:
+                # Queue changed while playing, keep the look-ahead in sync
+                self.prefetcher.schedule(guild_id, player.queue)
+
+            if not player.is_playing and player.queue:
                 await self.play_next_song(guild_id)
                
     async def reconnect_to_voice_channel(self, guild_id, retry_count=0):
-        # Get the voice channel for the guild
-        voice_channel = next((vc.channel for vc in self.voice_clients if vc.guild.id == guild_id), None)
+        # Get the voice channel the guild's player was last connected to
+        player = self.players.get(guild_id)
+        voice_channel = player.voice_client.channel if player and player.voice_client else None
 
         if voice_channel:
             # Check if the bot is already connected to the correct voice channel
-            if self.voice_clients and voice_channel == self.voice_clients[0].channel:
-                # Update the is_playing_dict
-                self.is_playing_dict[guild_id] = False
+            if player.is_connected:
+                # Update the playing state
+                player.is_playing = False
 
                 # Check if there are songs in the queue
-                if self.server_data[guild_id]['queue']:
+                if player.queue:
                     # Play the next song
                     await self.play_next_song(guild_id)
             else:
                 try:
                     # Bot is not in the correct voice channel, reconnect
-                    if self.voice_clients:
-                        # Disconnect from the current voice channel
-                        await self.voice_clients[0].disconnect()
+                    # Make sure the stale voice client is fully torn down
+                    await player.voice_client.disconnect(force=True)
 
-                    # Exponential backoff with a maximum delay of 60 seconds
+                    # Exponential backoff with a maximum delay of 600 seconds
                     delay = min(2**retry_count, 600)
                     await asyncio.sleep(delay)
 
-                    # Connect to the correct voice channel
-                    voice_client = await voice_channel.connect()
-                    await voice_client.guild.change_voice_state(channel=voice_channel, self_deaf=True)
+                    async with player.lock:
+                        # /stop may have removed the guild while we were waiting
+                        if self.players.get(guild_id) is not player or player.is_connected:
+                            return
 
-                    # Store the voice client in server_data
-                    self.server_data[guild_id]['voice_client'] = voice_client
+                        # Connect to the correct voice channel
+                        async with self.voice_limiter.slot(guild_id):
+                            voice_client = await voice_channel.connect()
+                            await voice_client.guild.change_voice_state(channel=voice_channel, self_deaf=True)
 
-                    # Update the is_playing_dict
-                    self.is_playing_dict[guild_id] = False
+                        # Store the voice client on the guild's player
+                        player.voice_client = voice_client
+
+                        # Update the playing state
+                        player.is_playing = False
 
                     # Check if there are songs in the queue
-                    if self.server_data[guild_id]['queue']:
-                        # Check if the bot was playing before the disconnection
-                        if self.server_data[guild_id]['is_playing']:
-                            # Resume playback
-                            voice_client.resume()
-                        else:
-                            # Play the next song
-                            await self.play_next_song(guild_id)
+                    if player.queue:
+                        # Play the next song
+                        await self.play_next_song(guild_id)
                 except nextcord.errors.ClientException as e:
-                    print(f"Error reconnecting to voice channel: {e}")
+                    logging.error(f"Error reconnecting to voice channel: {e}")
                     # Retry with an increased count
                     await self.reconnect_to_voice_channel(guild_id, retry_count + 1)
 
     class YTDLSource:
-        def __init__(self, data, ffmpeg_options):
-            self.data = data
-            self.url = data.get('url')
+        def __init__(self, entry, ffmpeg_options, local_path=None, passthrough=False, fanout=None, ffmpeg_sources=None):
+            self.entry = entry  # QueueEntry, not the full yt_dlp info_dict
+            self.url = local_path or entry.stream_url
+            self.passthrough = passthrough  # input is Opus: remux instead of decode / re-encode
+            self.fanout = fanout  # FanoutHub or None
+            self.ffmpeg_sources = ffmpeg_sources  # Bot.ffmpeg_sources, for the metrics gauge
             self.ffmpeg_options = ffmpeg_options  # Assign ffmpeg_options from the Bot class
+            if local_path:
+                # The reconnect flags only apply to network input
+                self.ffmpeg_options = dict(ffmpeg_options, before_options=None)
             self.player = None
+            self.stderr = None
 
         def create_ffmpeg_player(self):
-            return nextcord.FFmpegPCMAudio(self.url, **self.ffmpeg_options)
+            if self.fanout is not None:
+                # Join a broadcast of the same track started moments ago in another guild, or start one
+                key = (self.entry.cache_key, 0, self.passthrough)  # (track, start offset, output type)
+                self.player, _ = self.fanout.subscribe(key, self.create_ffmpeg_source)
+            else:
+                self.player = self.create_ffmpeg_source()
+            return self.player
+
+        def create_ffmpeg_source(self):
+            # Keep ffmpeg's stderr so a 403 on a stale stream URL can be detected afterwards
+            self.stderr = tempfile.TemporaryFile()
+            if self.passthrough:
+                # codec='opus' makes ffmpeg copy the packets into Ogg; nextcord sends them without encoding
+                source = nextcord.FFmpegOpusAudio(self.url, codec='opus', stderr=self.stderr, **self.ffmpeg_options)
+            else:
+                source = nextcord.FFmpegPCMAudio(self.url, stderr=self.stderr, **self.ffmpeg_options)
+            if self.ffmpeg_sources is not None:
+                self.ffmpeg_sources.add(source)
+            return source
+
+        def stream_forbidden(self):
+            if self.stderr is None:
+                return False
+            try:
+                self.stderr.seek(0)
+                output = self.stderr.read()
+            finally:
+                self.stderr.close()
+                self.stderr = None
+            return b'403 Forbidden' in output
 
         async def pause(self):
             if self.player:
@@ -594,8 +1205,6 @@ class Bot(commands.Bot):
 intents = nextcord.Intents.default()
 intents.message_content = True
 bot = Bot(command_prefix='!', intents=intents)
-start_time = datetime.now()
-operation_semaphore = asyncio.Semaphore(100)  # Adjust the value as needed
 
 @bot.slash_command(name="play", description="Add A Playlist, Mix, Or Single Vid By URL")
 async def play(ctx, url: str = SlashOption(description="Single Videos, Playlists & Mixes *NO SEARCHING*")):
@@ -605,22 +1214,26 @@ async def play(ctx, url: str = SlashOption(description="Single Videos, Playlists
 async def stop(ctx):
     guild_id = ctx.guild.id
 
-    # Get the voice client for the current guild
-    voice_client = next((vc for vc in bot.voice_clients if vc.guild.id == guild_id), None)
+    # Get the player and voice client for the current guild
+    player = bot.players.get(guild_id)
+    voice_client = player.voice_client if player else None
 
     if voice_client:
-        # Stop playback
-        voice_client.stop()
+        async with player.lock:
+            # Remove the guild first so the disconnect below is not treated as a drop to reconnect from
+            bot.players.remove(guild_id)
 
-        # Clear the queue for the specific guild
-        if guild_id in bot.server_data and 'queue' in bot.server_data[guild_id]:
-            bot.server_data[guild_id]['queue'] = []
+            # Stop playback
+            voice_client.stop()
 
-        # Disconnect from the voice channel
-        await voice_client.disconnect()
+            # Clear the queue and cancel the player task and playlist loading for the guild
+            player.clear()
 
-        # Update is_playing_dict
-        bot.is_playing_dict[guild_id] = False
+            # Cancel any look-ahead resolving for the cleared queue
+            bot.prefetcher.clear(guild_id)
+
+            # Disconnect from the voice channel
+            await voice_client.disconnect()
 
         # Send embed message with username and avatar of the user who triggered the command
         title = "Playback Stopped"
@@ -638,8 +1251,9 @@ async def skip(
 
     guild_id = ctx.guild.id
 
-    # Get the voice client for the current guild
-    voice_client = next((vc for vc in bot.voice_clients if vc.guild.id == guild_id), None)
+    # Get the player and voice client for the current guild
+    player = bot.players.get(guild_id)
+    voice_client = player.voice_client if player else None
 
     if not voice_client or not voice_client.is_playing():
         await ctx.send("There are no songs currently playing.")
@@ -651,15 +1265,19 @@ async def skip(
     # Ensure the number of songs to skip is positive
     num_songs = max(1, num_songs)
 
-    # Stop the current playback
-    voice_client.stop()
+    async with player.lock:
+        # Stop the current playback
+        voice_client.stop()
 
-    # Access the queue for the specific guild using bot instead of self
-    for _ in range(num_songs - 1):  # Skip one less, as we've already stopped one song
-        if bot.server_data[guild_id]['queue']:
-            bot.server_data[guild_id]['queue'].popleft()
-        else:
-            break  # Stop if the queue is empty
+        # Access the queue for the specific guild using bot instead of self
+        for _ in range(num_songs - 1):  # Skip one less, as we've already stopped one song
+            if player.queue:
+                player.queue.popleft()
+            else:
+                break  # Stop if the queue is empty
+
+    # Drop prefetches for skipped songs and start on the new upcoming ones
+    bot.prefetcher.schedule(guild_id, player.queue)
 
     # Send an embed message with username and avatar of the user who triggered the command
     title = "Song(s) Skipped"
@@ -673,18 +1291,27 @@ async def skip(
 async def show_queue(ctx):
     guild_id = ctx.guild.id
     user = ctx.user
-
-    # Check if the guild has a queue
-    if guild_id in bot.server_data and 'queue' in bot.server_data[guild_id]:
-        queue_embed = await bot.get_queue_embed(guild_id, user)
-        await ctx.send(embed=queue_embed)
+    current_guild_id.set(guild_id)
+
+    # Restoring a saved queue and rendering the page can take longer than Discord waits for a response
+    await ctx.response.defer()
+
+    # Check if the guild has a queue (possibly one saved before a restart)
+    if await bot.get_player(guild_id, create=False):
+        # One page at a time; the buttons render further pages on demand
+        view = QueueView(
+            lambda page: bot.get_queue_embed(guild_id, user, page),
+            lambda: bot.queue_page_count(guild_id),
+            user.id,
+            timeout=config_data.get('queue_view_timeout', 120),
+        )
+        await view.start(ctx)
     else:
-        await ctx.send("There is no queue for this server.")
+        await ctx.followup.send("There is no queue for this server.")
 
 @bot.slash_command(name="reportanerror", description="Report an error or issue to the bot owner.")
 async def report_an_error(ctx, message: str = nextcord.SlashOption(description="Enter your error report here")):
-    # Replace 'YOUR_USER_ID' with your actual Discord user ID
-    owner_user_id = 820062277842632744
+    owner_user_id = OWNER_USER_ID
 
     try:
         # Fetch the bot owner using the user ID
@@ -726,7 +1353,7 @@ async def report_an_error(ctx, message: str = nextcord.SlashOption(description="
         # Send the error message with the embed
         await ctx.send(embed=error_embed)
     except Exception as e:
-        print(f"An error occurred while processing the report_an_error command: {e}")
+        logging.error(f"An error occurred while processing the report_an_error command: {e}")
 
         # Create an embed for the error message
         error_embed = nextcord.Embed(
@@ -739,23 +1366,107 @@ async def report_an_error(ctx, message: str = nextcord.SlashOption(description="
         # Send the error message with the embed
         await ctx.send(embed=error_embed)
 
+def profile_summary(profiler, path):
+    busy = profiler.samples - profiler.idle
+    lines = [f"`{path}`", f"{profiler.samples} samples, {busy / profiler.samples if profiler.samples else 0:.0%} of them busy"]
+    for label, samples in profiler.top():
+        lines.append(f"`{samples / busy:>4.0%}` {label}")
+    return "\n".join(lines)
+
+@bot.slash_command(name="profile", description="Owner only: sample where the event loop spends its time")
+async def profile(
+    ctx,
+    action: str = SlashOption(description="Start or stop the profiler", choices=["start", "stop"]),
+    seconds: int = SlashOption(description="How long to sample (default 30)", required=False, min_value=1, max_value=600),
+):
+    if ctx.user.id != OWNER_USER_ID:
+        await ctx.send("This command is only available to the bot owner.", ephemeral=True)
+        return
+
+    if action == "start":
+        async def on_done(profiler, path):
+            embed = nextcord.Embed(title="Profile Finished", description=profile_summary(profiler, path), color=0x3498db)
+            await ctx.followup.send(embed=embed, ephemeral=True)
+
+        seconds = seconds or 30
+        if bot.start_profiler(seconds, on_done):
+            await ctx.send(f"Profiling the event loop of worker {WORKER_ID} for {seconds}s.", ephemeral=True)
+        else:
+            await ctx.send("The profiler is already running. Use `/profile stop` to end it.", ephemeral=True)
+    else:
+        profiler, path = await bot.stop_profiler()
+        if profiler is None:
+            await ctx.send("The profiler is not running.", ephemeral=True)
+            return
+        embed = nextcord.Embed(title="Profile Finished", description=profile_summary(profiler, path), color=0x3498db)
+        await ctx.send(embed=embed, ephemeral=True)
+
 @bot.slash_command(name="stats", description="Show bot uptime")
 async def uptime(ctx):
+    # Guild counts and uptime across every worker process
+    worker_stats = await bot.gather_stats()
+    live_workers = [stats for stats in worker_stats if stats]
+    deployment_start = datetime.fromtimestamp(min(stats['started'] for stats in live_workers))
+
     current_time = datetime.now()
-    uptime_duration = current_time - start_time
+    uptime_duration = current_time - deployment_start
     days, hours, minutes, seconds = uptime_duration.days, uptime_duration.seconds // 3600, (uptime_duration.seconds // 60) % 60, uptime_duration.seconds % 60
 
     # Format the date and uptime for display
-    start_time_str = start_time.strftime("`%A, %B %d, %Y`")  # Updated date format
+    start_time_str = deployment_start.strftime("`%A, %B %d, %Y`")  # Updated date format
     uptime_str = f"`{days}d {hours}h {minutes}m {seconds}s`"  # Simplified uptime format
 
     # Get the number of servers the bot is in
-    server_count = len(bot.guilds)
+    server_count = sum(stats['guilds'] for stats in live_workers)
+    shard_count = sum(len(stats['shard_ids']) for stats in live_workers)
+    processes_str = f"`{len(live_workers)}/{len(worker_stats)} up, {shard_count} shards, {sum(stats['players'] for stats in live_workers)} active players`"
+
+    # Extraction backlog (calls waiting for a free worker)
+    extraction_stats = bot.extractor.stats()
+    coalesce_stats = bot.single_flight.stats()
+    extraction_str = f"`{extraction_stats['queue_depth']} queued / {extraction_stats['pending']} in flight, {coalesce_stats['coalesced']} duplicate requests coalesced`"
+
+    # Metadata cache effectiveness
+    cache_stats = bot.metadata_cache.stats()
+    cache_str = f"`{cache_stats['memory_hits'] + cache_stats['disk_hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})`"
+    stream_stats = bot.stream_cache.stats()
+    stream_str = f"`{stream_stats['hits']} reused / {stream_stats['misses']} resolved`"
+    prefetch_stats = bot.prefetcher.stats()
+    prefetch_str = f"`{prefetch_stats['hits']} ready / {prefetch_stats['misses']} cold ({prefetch_stats['in_flight']} in flight)`"
+    api_stats = bot.youtube.stats()
+    api_str = f"`{api_stats['requests']} requests, {api_stats['avg_latency'] * 1000:.0f}ms avg, {api_stats['retried']} retried, {api_stats['failures']} failed`"
+
+    # Data API quota left today (this process's share) and calls served by yt_dlp instead
+    quota_stats = bot.youtube.quota.stats()
+    quota_str = f"`{quota_stats['remaining']:,}/{quota_stats['daily_quota']:,} units left{' (exhausted)' if quota_stats['exhausted'] else ''}, {quota_stats['fallbacks']} yt_dlp fallbacks`"
+
+    # Audio formats picked for the voice channels' bitrates
+    format_stats = bot.format_selector.stats()
+    top_formats = ", ".join(f"{name} ×{count}" for name, count in format_stats['top']) or "none yet"
+    format_str = f"`{format_stats['avg_bitrate']:.0f}k avg for {format_stats['avg_target']:.0f}k channels ({top_formats})`"
+
+    # Shared decode: upstream ffmpeg processes against the voice clients they feed
+    if bot.fanout:
+        fanout_stats = bot.fanout.stats()
+        fanout_str = f"`{fanout_stats['upstreams']} ffmpeg for {fanout_stats['subscribers']} listeners, {fanout_stats['joined']} shared starts`"
+    else:
+        fanout_str = "`disabled`"
+
+    # Plays served from local files
+    if bot.audio_cache:
+        audio_stats = bot.audio_cache.stats()
+        audio_str = f"`{audio_stats['hits']} plays from disk, {audio_stats['tracks']} tracks, {audio_stats['bytes'] / 1024 ** 3:.1f}/{audio_stats['max_bytes'] / 1024 ** 3:.0f} GB`"
+    else:
+        audio_str = "`disabled`"
+
+    # Average / max time spent waiting for a concurrency slot
+    limiter_stats = extraction_stats['limiters'] + [bot.youtube.limiter.stats(), bot.voice_limiter.stats()]
+    waits_str = ", ".join(f"{stats['name']} `{stats['avg_wait'] * 1000:.0f}/{stats['max_wait'] * 1000:.0f}ms`" for stats in limiter_stats)
 
     # Create an embed with bot information
     embed = nextcord.Embed(
         title="Bot Stats",
-        description=f"🚀 **Started on:** {start_time_str}\n⏰ **Uptime:** {uptime_str}\n🌐 **Servers:** `{server_count}`",
+        description=f"🚀 **Started on:** {start_time_str}\n⏰ **Uptime:** {uptime_str}\n🌐 **Servers:** `{server_count}`\n🖥️ **Processes:** {processes_str}\n⚙️ **Extraction:** {extraction_str}\n🗂️ **Metadata cache:** {cache_str}\n🔗 **Stream URLs:** {stream_str}\n⏭️ **Prefetch:** {prefetch_str}\n📡 **YouTube API:** {api_str}\n📊 **API quota:** {quota_str}\n🎚️ **Formats:** {format_str}\n💾 **Audio cache:** {audio_str}\n📻 **Fan-out:** {fanout_str}\n⏳ **Waits (avg/max):** {waits_str}",
         color=0x3498db  # You can set the color based on your preference
     )
 
@@ -813,4 +1524,5 @@ async def help_command(ctx):
     # Send the embed as a response
     await ctx.send(embed=embed)
    
-bot.run(config_data.get('token'))
+if __name__ == '__main__':
+    bot.run(config_data.get('token'))
@@ -0,0 +1,166 @@
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+
+# Guild the current task is working for. Set by commands and the player task, and
+# inherited by every task they spawn (prefetches, playlist loaders).
+current_guild_id = contextvars.ContextVar('current_guild_id', default=None)
+
+# Video ID of the track the current task is working on, for log records
+current_track_id = contextvars.ContextVar('current_track_id', default=None)
+
+
+class FairLimiter:
+    # Bounded concurrency that hands out free slots round-robin across guilds, so one
+    # guild queueing hundreds of calls cannot starve everybody else.
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self._active = 0
+        self._waiters = OrderedDict()  # guild_id -> deque of futures, in round-robin order
+
+        # Wait time bookkeeping
+        self.acquired = 0
+        self.waited = 0  # acquisitions that had to queue
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, key=None):
+        if key is None:
+            key = current_guild_id.get()
+
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.acquired += 1
+            return
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we got cancelled, pass it on
+                self.release()
+            else:
+                self._discard(key, future)
+            raise
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.waited += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def release(self):
+        self._active -= 1
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, key=None):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _discard(self, key, future):
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[key]
+
+    def _wake_next(self):
+        while self._active < self.limit and self._waiters:
+            # Serve the guild at the front, then move it to the back of the rotation
+            key, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'limit': self.limit,
+            'active': self._active,
+            'waiting': self.waiting,
+            'acquired': self.acquired,
+            'avg_wait': self.wait_total / self.acquired if self.acquired else 0.0,
+            'max_wait': self.wait_max,
+        }
+
+
+class SingleFlight:
+    # Coalesces concurrent calls for the same key into one: the first caller starts the call,
+    # everybody asking for the same key while it runs awaits the same task and gets the same
+    # result or exception. Nothing is cached once the call finishes.
+    #
+    # A caller that is cancelled only stops waiting; the call keeps running for the others and
+    # is cancelled only when the last waiter has gone.
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+
+        self.started = 0  # calls actually made
+        self.coalesced = 0  # callers served by a call somebody else started
+
+    async def do(self, key, func, *args):
+        call = self._calls.get(key)
+        if call is None:
+            # Runs in a task of its own (inheriting this caller's context), so it can outlive the caller
+            call = self._calls[key] = _Call(asyncio.ensure_future(func(*args)))
+            call.task.add_done_callback(lambda task, key=key, call=call: self._finished(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Everybody gave up; later callers start a fresh call instead of joining this one
+                self._finished(key, call)
+                call.task.cancel()
+
+    def _finished(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    @property
+    def in_flight(self):
+        return len(self._calls)
+
+    def stats(self):
+        return {'in_flight': len(self._calls), 'started': self.started, 'coalesced': self.coalesced}
+
+
+class _Call:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+from concurrency import FairLimiter
+
+
+# Runs inside the worker (thread or process), so it must stay a plain module-level
+# function that can be pickled for the process pool.
+def _extract_info(url, ydl_opts):
+    # Imported on first use: yt_dlp and its extractors take a few hundred ms to import
+    import yt_dlp
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info_dict = ydl.extract_info(url, download=False)
+            # Strip anything that cannot cross a process boundary
+            return ydl.sanitize_info(info_dict)
+    except yt_dlp.utils.YoutubeDLError as e:
+        # Callers should not need yt_dlp imported just to catch its errors
+        raise ExtractionError(str(e)) from None
+
+
+def _download(url, ydl_opts):
+    # Download with yt_dlp and return the path of the finished file
+    import yt_dlp
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info_dict = ydl.extract_info(url, download=True)
+            downloads = info_dict.get('requested_downloads') or [{}]
+            return downloads[0].get('filepath') or ydl.prepare_filename(info_dict)
+    except yt_dlp.utils.YoutubeDLError as e:
+        raise ExtractionError(str(e)) from None
+
+
+class ExtractionError(Exception):
+    # yt_dlp ExtractorError / DownloadError, with the original message
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    # A subclass so callers handling failed extractions also skip past slow ones
+    pass
+
+
+class ExtractionExecutor:
+    # Keeps every blocking yt_dlp call off the event loop, optionally in a process pool.
+    # Admission is controlled by a per-guild fair limiter in front of the pool. Audio cache
+    # downloads run for minutes, so they get a pool and limiter of their own and never hold
+    # an extraction slot.
+    def __init__(self, max_workers=4, use_processes=False, default_timeout=60, download_workers=1):
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.default_timeout = default_timeout
+
+        self.extraction_limiter = FairLimiter('extraction', max_workers)
+        self.download_limiter = FairLimiter('download', download_workers)
+
+        # One thread per slot. A call keeps its slot until its worker has finished, even after
+        # the caller timed out or was cancelled, so the pools themselves never queue.
+        self._thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='extract')
+        self._process_pool = ProcessPoolExecutor(max_workers=max_workers) if use_processes else None
+        self._download_pool = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix='download')
+
+    @property
+    def queue_depth(self):
+        # Extractions waiting for a free worker
+        return self.extraction_limiter.waiting
+
+    @property
+    def in_flight(self):
+        return self.extraction_limiter.waiting + self.extraction_limiter.active
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'mode': 'process' if self.use_processes else 'thread',
+            'pending': self.in_flight,
+            'running': self.extraction_limiter.active,
+            'queue_depth': self.extraction_limiter.waiting,
+            'limiters': [self.extraction_limiter.stats(), self.download_limiter.stats()],
+        }
+
+    async def _submit(self, limiter, pool, func, args, timeout, kind='run'):
+        loop = asyncio.get_running_loop()
+        if timeout is None:
+            timeout = self.default_timeout
+
+        await limiter.acquire()
+
+        # The timeout starts here, once a worker is free for the call
+        try:
+            pool_future = pool.submit(func, *args)
+        except BaseException:
+            limiter.release()
+            raise
+        # The slot goes back when the worker is done, not when we stop waiting for it. The done
+        # callback runs in the worker thread, or in ours when a call is cancelled before it started.
+        pool_future.add_done_callback(lambda _: self._release_soon(loop, limiter))
+
+        future = asyncio.wrap_future(pool_future)
+        started = loop.time()
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            # The worker cannot be interrupted; a call that has not started yet is dropped
+            future.cancel()
+            raise ExtractionTimeout(f"{getattr(func, '__name__', 'call')} timed out after {timeout}s")
+        finally:
+            metrics.extraction_seconds.observe(loop.time() - started, kind)
+
+    @staticmethod
+    def _release_soon(loop, limiter):
+        try:
+            loop.call_soon_threadsafe(limiter.release)
+        except RuntimeError:
+            pass  # the loop is already closed at shutdown
+
+    async def extract_info(self, url, ydl_opts=None, timeout=None):
+        ydl_opts = ydl_opts or {'quiet': True}
+        pool = self._process_pool or self._thread_pool
+        return await self._submit(self.extraction_limiter, pool, _extract_info, (url, ydl_opts), timeout, 'extract_info')
+
+    async def download(self, url, ydl_opts, timeout=None):
+        # Own pool and slots; downloads are long, so callers pass a larger timeout
+        return await self._submit(self.download_limiter, self._download_pool, _download, (url, ydl_opts), timeout, 'download')
+
+    async def run(self, func, *args, timeout=None):
+        # Generic blocking call
+        return await self._submit(self.extraction_limiter, self._thread_pool, func, args, timeout)
+
+    def shutdown(self):
+        logging.info("Shutting down extraction executor")
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        self._download_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
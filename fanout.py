@@ -0,0 +1,159 @@
+import threading
+from collections import deque
+
+import nextcord
+
+FRAME_SECONDS = 0.02  # one Discord audio frame
+
+
+class Broadcast:
+    # One upstream audio source (one ffmpeg process) read on behalf of several voice clients.
+    #
+    # There is no reader thread: whichever subscriber runs out of buffered frames pulls the
+    # next frame from upstream and pushes it into every subscriber's ring buffer. Upstream
+    # therefore advances at the pace of the fastest listener, and slower ones play from their
+    # buffer. A subscriber that falls a whole buffer behind loses its oldest frames instead of
+    # holding everybody else back. The first `history_frames` frames are kept so that a
+    # listener joining shortly after the start still hears the track from the beginning.
+    def __init__(self, hub, key, upstream, buffer_frames, history_frames):
+        self.hub = hub
+        self.key = key
+        self.upstream = upstream
+        self.buffer_frames = buffer_frames
+        self.history_frames = history_frames
+
+        self.history = []  # frames 0..history_frames-1, dropped once the join window is over
+        self.frames_read = 0
+        self.finished = False
+        self.closed = False  # last subscriber left and upstream was cleaned up
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    @property
+    def joinable(self):
+        return not self.closed and not self.finished and self.history is not None and self.frames_read < self.history_frames
+
+    def subscribe(self):
+        # None when the broadcast closed since joinable was checked
+        with self.lock:
+            if self.closed:
+                return None
+            subscriber = FanoutSubscriber(self, self.buffer_frames)
+            # Late joiner: start from the first frame like everybody else did
+            subscriber.buffer.extend(self.history or ())
+            self.subscribers.add(subscriber)
+            return subscriber
+
+    def pull(self, subscriber):
+        # Called from a voice client's player thread when its buffer is empty
+        with self.lock:
+            if subscriber.buffer:
+                # Another subscriber pulled for us in the meantime
+                return subscriber.buffer.popleft()
+            if self.finished:
+                return b''
+
+            frame = self.upstream.read()
+            if not frame:
+                self.finished = True
+                return b''
+
+            self.frames_read += 1
+            if self.history is not None:
+                if self.frames_read <= self.history_frames:
+                    self.history.append(frame)
+                else:
+                    self.history = None  # past the join window
+
+            for other in self.subscribers:
+                if other is not subscriber:
+                    if len(other.buffer) == other.buffer.maxlen:
+                        other.dropped += 1
+                        self.hub.frames_dropped += 1
+                    other.buffer.append(frame)
+            return frame
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+            last = not self.subscribers and not self.closed
+            if last:
+                self.closed = True
+        if last:
+            self.hub.remove(self)
+            self.upstream.cleanup()
+
+
+class FanoutSubscriber(nextcord.AudioSource):
+    # What a single voice client plays: frames from its own ring buffer
+    def __init__(self, broadcast, buffer_frames):
+        self.broadcast = broadcast
+        self.buffer = deque(maxlen=buffer_frames)
+        self.dropped = 0
+        self._closed = False
+
+    def read(self):
+        if self.buffer:
+            try:
+                return self.buffer.popleft()
+            except IndexError:
+                pass
+        return self.broadcast.pull(self)
+
+    def is_opus(self):
+        return self.broadcast.upstream.is_opus()
+
+    def cleanup(self):
+        if not self._closed:
+            self._closed = True
+            self.buffer.clear()
+            self.broadcast.unsubscribe(self)
+
+
+class FanoutHub:
+    # One Broadcast per (track, start offset, passthrough) that started within the last
+    # `window` seconds. Guilds starting the same track inside the window share its ffmpeg
+    # process and download; later starts get a broadcast of their own.
+    def __init__(self, window=5.0, buffer_seconds=10.0):
+        self.history_frames = max(1, int(window / FRAME_SECONDS))
+        self.buffer_frames = max(self.history_frames, int(buffer_seconds / FRAME_SECONDS))
+        self._broadcasts = {}  # key -> most recent Broadcast
+        self._live = set()
+        self._lock = threading.Lock()
+
+        self.started = 0  # upstream sources created
+        self.joined = 0  # subscriptions served by an existing upstream
+        self.frames_dropped = 0
+
+    def subscribe(self, key, create_source):
+        # Returns (AudioSource, shared); create_source() builds the upstream when nobody can be joined
+        with self._lock:
+            broadcast = self._broadcasts.get(key)
+            if broadcast is not None and broadcast.joinable:
+                subscriber = broadcast.subscribe()
+                if subscriber is not None:
+                    self.joined += 1
+                    return subscriber, True
+
+            broadcast = Broadcast(self, key, create_source(), self.buffer_frames, self.history_frames)
+            self._broadcasts[key] = broadcast
+            self._live.add(broadcast)
+            self.started += 1
+            return broadcast.subscribe(), False
+
+    def remove(self, broadcast):
+        with self._lock:
+            self._live.discard(broadcast)
+            if self._broadcasts.get(broadcast.key) is broadcast:
+                del self._broadcasts[broadcast.key]
+
+    def stats(self):
+        with self._lock:
+            live = list(self._live)
+        return {
+            'upstreams': len(live),
+            'subscribers': sum(len(broadcast.subscribers) for broadcast in live),
+            'started': self.started,
+            'joined': self.joined,
+            'frames_dropped': self.frames_dropped,
+        }
@@ -0,0 +1,75 @@
+from collections import Counter
+
+
+def audio_codec(fmt):
+    # 'opus', 'mp4a.40.2' -> 'mp4a', 'none' / missing -> None
+    codec = (fmt.get('acodec') or 'none').split('.')[0]
+    return None if codec == 'none' else codec
+
+
+def format_bitrate(fmt):
+    # Audio bitrate in kbps, falling back to the total bitrate
+    return fmt.get('abr') or fmt.get('tbr') or 0
+
+
+class FormatSelector:
+    # Picks the stream to play out of yt_dlp's formats list.
+    #
+    # Discord re-encodes (or passes through) at the voice channel's bitrate, so anything above
+    # it is wasted bandwidth and anything far below sounds worse than it has to. Audio-only
+    # formats are ranked by:
+    #   policy 'codec':   preferred codec first (codecs order), then distance to the target bitrate
+    #   policy 'closest': distance to the target bitrate first, codec order breaks ties
+    # When a video has no audio-only format, the muxed format with the smallest bitrate is used.
+    def __init__(self, policy='codec', codecs=('opus', 'mp4a', 'vorbis')):
+        self.policy = policy
+        self.codecs = list(codecs)
+
+        # What got picked, for /stats
+        self.chosen = Counter()  # 'opus@130k' -> count
+        self.selected = 0
+        self.fallbacks = 0  # no audio-only format available
+        self.bitrate_total = 0.0
+        self.target_total = 0.0
+
+    def _codec_rank(self, fmt):
+        codec = audio_codec(fmt)
+        return self.codecs.index(codec) if codec in self.codecs else len(self.codecs)
+
+    def _rank(self, fmt, target_kbps):
+        distance = abs(format_bitrate(fmt) - target_kbps)
+        if self.policy == 'closest':
+            return (distance, self._codec_rank(fmt))
+        return (self._codec_rank(fmt), distance)
+
+    def select(self, formats, target_kbps):
+        # Returns the chosen format dict, or None when nothing has audio
+        playable = [
+            fmt for fmt in formats or []
+            if fmt.get('url') and audio_codec(fmt) and not (fmt.get('protocol') or '').startswith(('m3u8', 'http_dash'))
+        ]
+        audio_only = [fmt for fmt in playable if (fmt.get('vcodec') or 'none') == 'none']
+
+        if audio_only:
+            chosen = min(audio_only, key=lambda fmt: self._rank(fmt, target_kbps))
+        elif playable:
+            self.fallbacks += 1
+            chosen = min(playable, key=lambda fmt: format_bitrate(fmt) or float('inf'))
+        else:
+            return None
+
+        bitrate = format_bitrate(chosen)
+        self.chosen[f"{audio_codec(chosen)}@{bitrate:.0f}k"] += 1
+        self.selected += 1
+        self.bitrate_total += bitrate
+        self.target_total += target_kbps
+        return chosen
+
+    def stats(self):
+        return {
+            'selected': self.selected,
+            'fallbacks': self.fallbacks,
+            'avg_bitrate': self.bitrate_total / self.selected if self.selected else 0.0,
+            'avg_target': self.target_total / self.selected if self.selected else 0.0,
+            'top': self.chosen.most_common(3),
+        }
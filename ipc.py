@@ -0,0 +1,64 @@
+import asyncio
+import json
+import logging
+
+
+class WorkerIPC:
+    # Tiny localhost channel between the worker processes started by launcher.py.
+    # Worker N listens on base_port + N and answers one JSON line per request with the
+    # output of `collect()`; any worker can then ask all of them, e.g. for /stats.
+    def __init__(self, worker_id, worker_count, collect, host='127.0.0.1', base_port=47100, timeout=2.0):
+        self.worker_id = worker_id
+        self.worker_count = worker_count
+        self.collect = collect  # callable returning a JSON-serialisable dict about this worker
+        self.host = host
+        self.base_port = base_port
+        self.timeout = timeout
+        self._server = None
+
+    async def start(self):
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.base_port + self.worker_id)
+            logging.info(f"Worker {self.worker_id} IPC listening on {self.host}:{self.base_port + self.worker_id}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request = json.loads(await asyncio.wait_for(reader.readline(), timeout=self.timeout) or b'{}')
+            if request.get('op') == 'stats':
+                reply = self.collect()
+            else:
+                reply = {'error': f"unknown op {request.get('op')!r}"}
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+        except Exception as e:
+            logging.warning(f"IPC request failed: {e}")
+        finally:
+            writer.close()
+
+    async def _ask(self, worker_id, op):
+        reader, writer = await asyncio.open_connection(self.host, self.base_port + worker_id)
+        try:
+            writer.write(json.dumps({'op': op}).encode() + b'\n')
+            await writer.drain()
+            return json.loads(await reader.readline())
+        finally:
+            writer.close()
+
+    async def gather_stats(self):
+        # Stats of every worker, this one included; None for workers that did not answer
+        async def ask(worker_id):
+            if worker_id == self.worker_id:
+                return self.collect()
+            try:
+                return await asyncio.wait_for(self._ask(worker_id, 'stats'), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError, ValueError) as e:
+                logging.warning(f"Worker {worker_id} did not answer the stats request: {e}")
+                return None
+
+        return await asyncio.gather(*(ask(worker_id) for worker_id in range(self.worker_count)))
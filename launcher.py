@@ -0,0 +1,138 @@
+# Runs the bot as several worker processes, each owning a contiguous range of shards,
+# so gateway handling, extraction and audio packetization spread over all cores.
+#
+#   python launcher.py                         # one worker per core, Discord's recommended shard count
+#   python launcher.py --workers 4 --shards 16
+#
+# Workers are plain `python bot.py` processes configured through PIKATUNES_* environment
+# variables. A worker that exits is restarted after a short delay; Ctrl+C stops them all.
+
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from logconfig import setup_logging
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+setup_logging(path=os.path.join(BOT_DIR, 'launcher.log'))
+
+
+def shard_ranges(shard_count, workers):
+    # Split shards 0..shard_count-1 into `workers` contiguous, near-equal ranges
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for worker_id in range(workers):
+        size = base + (1 if worker_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def recommended_shard_count(token):
+    # Discord's recommended shard count for the bot (GET /gateway/bot); one shard serves at most 2500 guilds
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f"Bot {token}", 'User-Agent': 'DiscordBot (PikaTunes launcher)'},
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)['shards']
+
+
+class Worker:
+    def __init__(self, worker_id, worker_count, shard_ids, shard_count, ipc_port):
+        self.worker_id = worker_id
+        self.env = dict(
+            os.environ,
+            PIKATUNES_WORKER_ID=str(worker_id),
+            PIKATUNES_WORKER_COUNT=str(worker_count),
+            PIKATUNES_SHARD_IDS=','.join(map(str, shard_ids)),
+            PIKATUNES_SHARD_COUNT=str(shard_count),
+            PIKATUNES_IPC_PORT=str(ipc_port),
+        )
+        self.shard_ids = shard_ids
+        self.process = None
+        self.restart_at = 0
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, os.path.join(BOT_DIR, 'bot.py')], cwd=BOT_DIR, env=self.env)
+        logging.info(f"Started worker {self.worker_id} (pid {self.process.pid}) for shards {self.shard_ids[0]}-{self.shard_ids[-1]}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+
+def main():
+    with open(os.path.join(BOT_DIR, 'config.json'), 'r') as config_file:
+        config_data = json.load(config_file)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=config_data.get('workers') or os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, default=config_data.get('shard_count'))
+    parser.add_argument('--restart-delay', type=float, default=10.0)
+    args = parser.parse_args()
+
+    shard_count = args.shards
+    if not shard_count:
+        try:
+            shard_count = recommended_shard_count(config_data.get('token'))
+        except Exception as e:
+            # Guessing would get the identify rejected once the bot outgrows the guess
+            logging.error(f"Could not fetch the recommended shard count from Discord, pass --shards or set shard_count: {e}")
+            sys.exit(1)
+        logging.info(f"Discord recommends {shard_count} shards")
+    # Every worker needs at least one shard
+    shard_count = max(shard_count, args.workers)
+    ipc_port = config_data.get('ipc_port', 47100)
+    stagger = config_data.get('worker_start_stagger', 5)  # seconds between worker logins (identify rate limit)
+
+    ranges = shard_ranges(shard_count, args.workers)
+    workers = [Worker(worker_id, args.workers, shard_ids, shard_count, ipc_port) for worker_id, shard_ids in enumerate(ranges)]
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    for worker in workers:
+        if stopping:
+            break
+        worker.start()
+        time.sleep(stagger)
+
+    while not stopping:
+        time.sleep(1)
+        for worker in workers:
+            if worker.process.poll() is None:
+                continue
+            if not worker.restart_at:
+                logging.warning(f"Worker {worker.worker_id} exited with code {worker.process.returncode}, restarting in {args.restart_delay:.0f}s")
+                worker.restart_at = time.monotonic() + args.restart_delay
+            elif time.monotonic() >= worker.restart_at:
+                worker.restart_at = 0
+                worker.start()
+
+    logging.info("Stopping workers...")
+    for worker in workers:
+        worker.stop()
+    for worker in workers:
+        if worker.process:
+            try:
+                worker.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+
+if __name__ == '__main__':
+    main()
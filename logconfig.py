@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import colorama
+
+from concurrency import current_guild_id, current_track_id
+
+CONSOLE_COLORS = {
+    logging.DEBUG: colorama.Style.DIM,
+    logging.INFO: colorama.Fore.GREEN,
+    logging.WARNING: colorama.Fore.YELLOW,
+    logging.ERROR: colorama.Fore.RED,
+    logging.CRITICAL: colorama.Fore.RED + colorama.Style.BRIGHT,
+}
+
+
+class ContextFilter(logging.Filter):
+    # Runs on the queue handler in the caller's thread, where the guild / track of the task that logged can still be read.
+    # Values passed with extra={'guild_id': ..., 'track_id': ...} take precedence.
+    def __init__(self, worker_id=None):
+        super().__init__()
+        self.worker_id = worker_id
+
+    def filter(self, record):
+        if getattr(record, 'guild_id', None) is None:
+            record.guild_id = current_guild_id.get()
+        if getattr(record, 'track_id', None) is None:
+            record.track_id = current_track_id.get()
+        record.worker_id = self.worker_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps a repeating warning or error from flooding the log. Records are grouped by call
+    # site; per `window` seconds the first `burst` of a group pass, then one in `every`. The
+    # next record that passes carries how many were dropped in `suppressed`.
+    def __init__(self, burst=10, every=100, window=60.0, level=logging.WARNING):
+        super().__init__()
+        self.burst = burst
+        self.every = max(1, every)
+        self.window = window
+        self.level = level
+        self._groups = {}  # (pathname, lineno) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None or now - group[0] >= self.window:
+                suppressed = group[2] if group is not None else 0
+                group = self._groups[key] = [now, 0, suppressed]
+                if len(self._groups) > 10000:
+                    # Forget call sites whose window is over
+                    self._groups = {k: v for k, v in self._groups.items() if now - v[0] < self.window}
+                    self._groups[key] = group
+            group[1] += 1
+            count = group[1]
+            if count > self.burst and (count - self.burst) % self.every:
+                group[2] += 1
+                return False
+            record.suppressed = group[2]
+            group[2] = 0
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    # One JSON object per line
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in ('guild_id', 'track_id', 'worker_id'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed  # similar records dropped by sampling since the last one
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
+
+    def format(self, record):
+        return CONSOLE_COLORS.get(record.levelno, '') + super().format(record) + colorama.Style.RESET_ALL
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() folds the traceback into the message; keep it separate for the JSON field
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def setup_logging(path='bot.log', level=logging.INFO, max_bytes=50 * 1024 ** 2, backup_count=5, console=True,
+                  worker_id=None, sample_burst=10, sample_every=100, sample_window=60.0):
+    # Callers only put records on a queue; a listener thread formats them and does the file and console I/O.
+    # Returns the listener, which is stopped (and the queue drained) at exit.
+    colorama.init(autoreset=True)
+
+    handlers = []
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JSONFormatter())
+    handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(burst=sample_burst, every=sample_every, window=sample_window))
+    queue_handler.addFilter(ContextFilter(worker_id))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Fields kept for every track, keyed by YouTube video ID
+METADATA_FIELDS = ('title', 'duration', 'channel', 'thumbnail')
+
+
+def metadata_from_info_dict(info_dict):
+    # Reduce a yt_dlp info_dict to the cached fields
+    return {
+        'title': info_dict.get('title'),
+        'duration': info_dict.get('duration'),
+        'channel': info_dict.get('channel') or info_dict.get('uploader'),
+        'thumbnail': info_dict.get('thumbnail'),
+    }
+
+
+class MetadataCache:
+    # Two tiers: an in-memory LRU with TTL in front of an on-disk SQLite table.
+    # SQLite work runs on its own single thread so the event loop never touches the disk.
+    def __init__(self, path='metadata_cache.sqlite3', max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._memory = OrderedDict()  # video_id -> (expires_at, record)
+        self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metadata-cache')
+        self._db = None
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS tracks ('
+                'video_id TEXT PRIMARY KEY, title TEXT, duration INTEGER, '
+                'channel TEXT, thumbnail TEXT, fetched_at REAL NOT NULL)'
+            )
+            self._db.commit()
+        return self._db
+
+    def _disk_get_many(self, video_ids):
+        with self._db_lock:
+            db = self._connect()
+            placeholders = ','.join('?' * len(video_ids))
+            rows = db.execute(
+                f'SELECT video_id, title, duration, channel, thumbnail, fetched_at FROM tracks WHERE video_id IN ({placeholders})',
+                list(video_ids),
+            ).fetchall()
+        return {row[0]: (row[5], dict(zip(METADATA_FIELDS, row[1:5]))) for row in rows}
+
+    def _disk_put_many(self, items):
+        with self._db_lock:
+            db = self._connect()
+            db.executemany(
+                'INSERT OR REPLACE INTO tracks (video_id, title, duration, channel, thumbnail, fetched_at) VALUES (?, ?, ?, ?, ?, ?)',
+                [(video_id, *(record.get(field) for field in METADATA_FIELDS), fetched_at) for video_id, fetched_at, record in items],
+            )
+            db.commit()
+
+    def _remember(self, video_id, expires_at, record):
+        self._memory[video_id] = (expires_at, record)
+        self._memory.move_to_end(video_id)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_cached(self, video_id):
+        # Memory tier only, safe to call from synchronous code
+        entry = self._memory.get(video_id)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.time():
+            del self._memory[video_id]
+            return None
+        self._memory.move_to_end(video_id)
+        return record
+
+    async def get(self, video_id):
+        return (await self.get_many([video_id])).get(video_id)
+
+    async def get_many(self, video_ids):
+        found = {}
+        missing = []
+        for video_id in dict.fromkeys(video_ids):
+            record = self.get_cached(video_id)
+            if record is not None:
+                self.memory_hits += 1
+                found[video_id] = record
+            else:
+                missing.append(video_id)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            try:
+                rows = await loop.run_in_executor(self._disk_executor, self._disk_get_many, missing)
+            except sqlite3.Error as e:
+                logging.error(f"Metadata cache read failed: {e}")
+                rows = {}
+
+            now = time.time()
+            for video_id in missing:
+                row = rows.get(video_id)
+                if row and row[0] + self.ttl > now:
+                    fetched_at, record = row
+                    self.disk_hits += 1
+                    self._remember(video_id, fetched_at + self.ttl, record)
+                    found[video_id] = record
+                else:
+                    self.misses += 1
+
+        return found
+
+    async def put(self, video_id, record):
+        await self.put_many({video_id: record})
+
+    async def put_many(self, records):
+        now = time.time()
+        items = []
+        for video_id, record in records.items():
+            record = {field: record.get(field) for field in METADATA_FIELDS}
+            self._remember(video_id, now + self.ttl, record)
+            items.append((video_id, now, record))
+
+        if items:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._disk_executor, self._disk_put_many, items)
+            except sqlite3.Error as e:
+                logging.error(f"Metadata cache write failed: {e}")
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self._disk_executor.shutdown(wait=True)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+import nextcord
+from aiohttp import web
+
+
+# Every metric registers itself here; /metrics renders them in order
+REGISTRY = []
+
+# Latency buckets in seconds, from a cache hit to a slow extraction
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()  # observations also come from audio and worker threads
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}  # label values -> count
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}' for key, value in values]
+
+
+class Gauge(Metric):
+    # Either set() explicitly, or computed at scrape time by `func` (no cost on the hot path)
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, func=None):
+        super().__init__(name, documentation)
+        self.func = func
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        value = self.value
+        if self.func is not None:
+            try:
+                value = self.func()
+            except Exception as e:
+                logging.warning(f"Metric {self.name} failed: {e}")
+                return []
+        return [f'{self.name} {_format_value(value)}']
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        # Count goes into the first bucket >= value; render() makes them cumulative
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, ("le", _format_value(bound)))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(values[-1])}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {cumulative}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.monotonic() - self.start, *self.label_values)
+
+
+def render():
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+# -- Metrics shared by the modules --------------------------------------------------------
+
+# The bot sets `func` on the gauges it computes from its own state
+
+extraction_seconds = Histogram('pikatunes_extraction_seconds', 'Time yt_dlp calls spend running on a worker, by call', labels=('kind',))
+play_to_first_frame_seconds = Histogram('pikatunes_play_to_first_frame_seconds', 'Time from /play on an idle guild to the first audio frame')
+inter_track_gap_seconds = Histogram('pikatunes_inter_track_gap_seconds', 'Silence between the end of a track and the first frame of the next')
+
+voice_clients = Gauge('pikatunes_voice_clients', 'Connected voice clients')
+ffmpeg_processes = Gauge('pikatunes_ffmpeg_processes', 'Running ffmpeg processes')
+queue_length = Gauge('pikatunes_queue_length', 'Songs queued across all guilds')
+loop_lag_seconds = Gauge('pikatunes_event_loop_lag_seconds', 'How late the last event loop lag probe woke up')  # set by profiler.LoopWatchdog
+
+api_requests = Counter('pikatunes_api_requests_total', 'YouTube Data API calls by endpoint and HTTP status', labels=('endpoint', 'status'))
+playback_errors = Counter('pikatunes_playback_errors_total', 'Songs skipped because they could not be played, by cause', labels=('type',))
+
+
+class FirstFrameTimer(nextcord.AudioSource):
+    # Passes frames through and calls `on_first_frame` (from the audio thread) when the first one is read
+    def __init__(self, source, on_first_frame):
+        self.source = source
+        self.on_first_frame = on_first_frame
+
+    def read(self):
+        data = self.source.read()
+        if self.on_first_frame is not None:
+            callback, self.on_first_frame = self.on_first_frame, None
+            callback()
+        return data
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
+
+
+async def start_metrics_server(host='127.0.0.1', port=9464):
+    # Prometheus scrape endpoint: GET /metrics
+    async def handle_metrics(request):
+        return web.Response(text=render(), content_type='text/plain', charset='utf-8', headers={'X-Content-Type-Options': 'nosniff'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def replay(entries, now_playing, ops):
+    # Apply journaled ops (oldest first) to a list of entry records
+    queue = deque(entries)
+    for op, payload in ops:
+        if op == 'push':
+            queue.extend(payload)
+        elif op == 'pushleft':
+            queue.extendleft(reversed(payload))
+        elif op == 'pop':
+            for _ in range(min(payload, len(queue))):
+                queue.popleft()
+        elif op == 'clear':
+            queue.clear()
+        elif op == 'reset':
+            queue = deque(payload)
+        elif op == 'now':
+            now_playing = payload
+    return list(queue), now_playing
+
+
+class QueueStore:
+    # Durable per-guild queue and now-playing state.
+    #
+    # Every queue mutation is appended to an op log in a SQLite WAL database. A periodic
+    # compaction folds the log into one snapshot row per guild. Nothing is read at startup:
+    # a guild's state is rebuilt (snapshot + newer ops) the first time the guild is used again.
+    def __init__(self, path='queues.sqlite3', flush_interval=1.0, compact_interval=300):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+
+        self._pending = []  # (guild_id, op, payload_json) waiting to be written
+        self._dirty = set()  # guilds with ops since the last compaction; only these are compacted here
+        self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='queue-store')
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._tasks = []
+
+        self.ops_written = 0
+        self.restored = 0
+
+    # -- journal side (event loop thread) -------------------------------------------------
+
+    def journal_for(self, guild_id):
+        def journal(op, payload):
+            if op in ('push', 'pushleft', 'reset'):
+                payload = [entry.to_record() for entry in payload]
+            elif op == 'now':
+                payload = payload.to_record() if payload is not None else None
+            self._pending.append((guild_id, op, json.dumps(payload, separators=(',', ':'))))
+            self._dirty.add(guild_id)
+        return journal
+
+    # -- background tasks ---------------------------------------------------------------
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run_every(self.flush_interval, self.flush)),
+                asyncio.create_task(self._run_every(self.compact_interval, self.compact)),
+            ]
+
+    async def _run_every(self, interval, func):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except Exception as e:
+                logging.error(f"Queue store {func.__name__} failed: {e}")
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._disk_executor, self._write_ops, pending)
+        self.ops_written += len(pending)
+
+    async def compact(self):
+        guild_ids, self._dirty = self._dirty, set()
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._disk_executor, self._compact, guild_ids)
+
+    async def load(self, guild_id):
+        # Returns (entry records, now playing record) or None when nothing is saved
+        await self.flush()  # make sure our own recent ops (e.g. a /stop) are on disk first
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(self._disk_executor, self._load, guild_id)
+        if state is not None:
+            self.restored += 1
+        return state
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        try:
+            await self.flush()
+        finally:
+            self._disk_executor.shutdown(wait=True)
+            with self._db_lock:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
+
+    def stats(self):
+        return {'pending_ops': len(self._pending), 'ops_written': self.ops_written, 'restored': self.restored}
+
+    # -- disk side (store thread) -----------------------------------------------------------
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS queue_log ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER NOT NULL, op TEXT NOT NULL, payload TEXT)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS queue_log_guild ON queue_log (guild_id, seq)')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS queue_snapshots ('
+                'guild_id INTEGER PRIMARY KEY, entries TEXT NOT NULL, now_playing TEXT, seq INTEGER NOT NULL)'
+            )
+            self._db.commit()
+        return self._db
+
+    def _write_ops(self, ops):
+        with self._db_lock:
+            db = self._connect()
+            db.executemany('INSERT INTO queue_log (guild_id, op, payload) VALUES (?, ?, ?)', ops)
+            db.commit()
+
+    def _read_state(self, db, guild_id):
+        snapshot = db.execute('SELECT entries, now_playing, seq FROM queue_snapshots WHERE guild_id = ?', (guild_id,)).fetchone()
+        if snapshot:
+            entries, now_playing, seq = json.loads(snapshot[0]), json.loads(snapshot[1]), snapshot[2]
+        else:
+            entries, now_playing, seq = [], None, 0
+
+        rows = db.execute('SELECT seq, op, payload FROM queue_log WHERE guild_id = ? AND seq > ? ORDER BY seq', (guild_id, seq)).fetchall()
+        if not snapshot and not rows:
+            return None
+        if rows:
+            seq = rows[-1][0]
+        entries, now_playing = replay(entries, now_playing, ((op, json.loads(payload)) for _, op, payload in rows))
+        return entries, now_playing, seq
+
+    def _load(self, guild_id):
+        with self._db_lock:
+            state = self._read_state(self._connect(), guild_id)
+        if state is None:
+            return None
+        entries, now_playing, _ = state
+        if not entries and now_playing is None:
+            return None
+        return entries, now_playing
+
+    def _compact(self, guild_ids):
+        # Other worker processes may share the database, so only guilds owned by this one are touched
+        compacted = 0
+        with self._db_lock:
+            db = self._connect()
+            for guild_id in guild_ids:
+                state = self._read_state(db, guild_id)
+                if state is None:
+                    continue
+                entries, now_playing, seq = state
+                compacted += 1
+                if entries or now_playing is not None:
+                    db.execute(
+                        'INSERT OR REPLACE INTO queue_snapshots (guild_id, entries, now_playing, seq) VALUES (?, ?, ?, ?)',
+                        (guild_id, json.dumps(entries, separators=(',', ':')), json.dumps(now_playing), seq),
+                    )
+                else:
+                    db.execute('DELETE FROM queue_snapshots WHERE guild_id = ?', (guild_id,))
+                db.execute('DELETE FROM queue_log WHERE guild_id = ? AND seq <= ?', (guild_id, seq))
+            db.commit()
+            db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        if compacted:
+            logging.info(f"Compacted queue log for {compacted} guilds")
@@ -0,0 +1,216 @@
+import asyncio
+import time
+from collections import deque
+
+
+class QueueEntry:
+    # One queued song. Extraction results are reduced to these fields right away instead of
+    # keeping yt_dlp's info_dict (every format, thumbnail and caption track) around.
+    __slots__ = ('video_id', 'query', 'title', 'duration', 'requester_id', 'stream_url', 'expires_at', 'codec')
+
+    def __init__(self, video_id=None, query=None, title=None, duration=None, requester_id=None):
+        self.video_id = video_id
+        self.query = None if video_id else query  # original URL / search text, only kept when there is no ID
+        self.title = title
+        self.duration = duration
+        self.requester_id = requester_id
+        self.stream_url = None
+        self.expires_at = 0
+        self.codec = None  # audio codec of stream_url as reported by yt_dlp, e.g. 'opus'
+
+    @classmethod
+    def from_url(cls, url, video_id=None, requester_id=None):
+        return cls(video_id=video_id, query=url, requester_id=requester_id)
+
+    @property
+    def url(self):
+        if self.video_id:
+            return f"https://www.youtube.com/watch?v={self.video_id}"
+        return self.query
+
+    @property
+    def cache_key(self):
+        return self.video_id or self.query
+
+    def apply_info(self, info_dict):
+        # Copy what we need out of an extraction result; the dict itself is dropped by the caller
+        self.video_id = self.video_id or info_dict.get('id')
+        if self.video_id:
+            self.query = None
+        self.title = info_dict.get('title') or self.title
+        self.duration = info_dict.get('duration') or self.duration
+
+    def set_stream(self, stream_url, expires_at, codec=None):
+        self.stream_url = stream_url
+        self.expires_at = expires_at
+        self.codec = codec
+
+    def clear_stream(self):
+        self.stream_url = None
+        self.expires_at = 0
+        self.codec = None
+
+    def is_stream_fresh(self, safety_margin=0):
+        # The URL has to stay valid until the track has finished playing
+        return bool(self.stream_url) and self.expires_at - safety_margin > time.time() + (self.duration or 0)
+
+    def to_record(self):
+        # Compact form used by the queue store
+        return [self.video_id, self.query, self.title, self.duration, self.requester_id]
+
+    @classmethod
+    def from_record(cls, record):
+        video_id, query, title, duration, requester_id = record
+        return cls(video_id=video_id, query=query, title=title, duration=duration, requester_id=requester_id)
+
+    def __repr__(self):
+        return f"QueueEntry({self.cache_key!r}, title={self.title!r})"
+
+
+class TrackQueue(deque):
+    # A deque of QueueEntry that reports every mutation to an optional journal callback
+    # (see persistence.QueueStore), so queue state can be persisted incrementally.
+    __slots__ = ('journal',)
+
+    def __init__(self, entries=(), journal=None):
+        super().__init__(entries)
+        self.journal = journal  # callable(op, payload) or None
+
+    def record(self, op, payload=None):
+        if self.journal is not None:
+            self.journal(op, payload)
+
+    def append(self, entry):
+        super().append(entry)
+        self.record('push', [entry])
+
+    def extend(self, entries):
+        entries = list(entries)
+        super().extend(entries)
+        self.record('push', entries)
+
+    def appendleft(self, entry):
+        super().appendleft(entry)
+        self.record('pushleft', [entry])
+
+    def extendleft(self, entries):
+        entries = list(entries)
+        super().extendleft(entries)
+        self.record('pushleft', entries[::-1])
+
+    def popleft(self):
+        entry = super().popleft()
+        self.record('pop', 1)
+        return entry
+
+    def clear(self):
+        super().clear()
+        self.record('clear')
+
+    def snapshot(self):
+        # Any other mutation: journal the whole queue
+        self.record('reset', list(self))
+
+    def pop(self):
+        entry = super().pop()
+        self.snapshot()
+        return entry
+
+    def remove(self, entry):
+        super().remove(entry)
+        self.snapshot()
+
+    def insert(self, index, entry):
+        super().insert(index, entry)
+        self.snapshot()
+
+    def rotate(self, n=1):
+        super().rotate(n)
+        self.snapshot()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.snapshot()
+
+    def __setitem__(self, index, entry):
+        super().__setitem__(index, entry)
+        self.snapshot()
+
+
+class GuildPlayer:
+    # Everything the bot tracks for one guild. Slotted because there is one per active guild.
+    __slots__ = (
+        'guild_id',
+        'queue',
+        'voice_client',
+        'is_playing',
+        'current_track',
+        'player_task',
+        'ingest_tasks',
+        'lock',
+        'requested_at',
+    )
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.queue = TrackQueue()
+        self.voice_client = None
+        self.is_playing = False
+        self.current_track = None  # QueueEntry currently handed to the voice client
+        self.player_task = None  # see Bot.player_loop
+        self.ingest_tasks = set()  # background playlist page loaders
+        self.lock = asyncio.Lock()  # held while mutating the queue or the voice connection
+        self.requested_at = None  # time.monotonic() of the /play that will start playback, for metrics
+
+    @property
+    def is_connected(self):
+        return self.voice_client is not None and self.voice_client.is_connected()
+
+    def set_current_track(self, entry):
+        self.current_track = entry
+        self.queue.record('now', entry)
+
+    def clear(self):
+        # Drop the queue and stop every background task owned by the guild
+        self.queue.clear()
+        self.set_current_track(None)
+        self.is_playing = False
+        if self.player_task is not None:
+            self.player_task.cancel()
+            self.player_task = None
+        for task in list(self.ingest_tasks):
+            task.cancel()
+
+
+class PlayerRegistry:
+    # guild_id -> GuildPlayer, so every command and event resolves its guild in O(1)
+    def __init__(self, journal_for=None):
+        self._players = {}
+        self.journal_for = journal_for  # guild_id -> journal callback for new queues, see QueueStore
+
+    def get(self, guild_id):
+        return self._players.get(guild_id)
+
+    def get_or_create(self, guild_id):
+        player = self._players.get(guild_id)
+        if player is None:
+            player = self._players[guild_id] = GuildPlayer(guild_id)
+            if self.journal_for is not None:
+                player.queue.journal = self.journal_for(guild_id)
+        return player
+
+    def remove(self, guild_id):
+        return self._players.pop(guild_id, None)
+
+    def voice_client(self, guild_id):
+        player = self._players.get(guild_id)
+        return player.voice_client if player is not None else None
+
+    def __contains__(self, guild_id):
+        return guild_id in self._players
+
+    def __iter__(self):
+        return iter(self._players.values())
+
+    def __len__(self):
+        return len(self._players)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from itertools import islice
+
+
+class Prefetcher:
+    # Resolves the next few queue entries of each guild in the background while the
+    # current track plays, so play_next_song can start the next one without waiting on yt_dlp.
+    # The resolved stream URL is stored on the QueueEntry itself.
+    def __init__(self, resolve, depth=2, max_in_flight=32, safety_margin=120):
+        self.resolve = resolve  # coroutine function: QueueEntry -> QueueEntry (resolved) or None
+        self.depth = depth
+        self.safety_margin = safety_margin
+        self._limit = asyncio.Semaphore(max_in_flight)  # global cap across all guilds
+        self._tasks = {}  # guild_id -> {entry: asyncio.Task}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def _prefetch(self, entry):
+        async with self._limit:
+            return await self.resolve(entry)
+
+    def schedule(self, guild_id, queue):
+        # Keep exactly the first `depth` entries of the queue in flight / resolved
+        if self.depth <= 0:
+            return
+        wanted = list(dict.fromkeys(islice(queue, self.depth)))
+        tasks = self._tasks.setdefault(guild_id, {})
+
+        # Entries that were skipped or removed no longer need resolving
+        for entry in list(tasks):
+            if entry not in wanted:
+                tasks.pop(entry).cancel()
+
+        for entry in wanted:
+            if entry not in tasks:
+                task = asyncio.create_task(self._prefetch(entry))
+                task.add_done_callback(self._log_failure)
+                tasks[entry] = task
+
+        if not tasks:
+            del self._tasks[guild_id]
+
+    async def take(self, guild_id, entry):
+        # Return the prefetched entry if it is about to play with a usable stream, or None
+        task = self._tasks.get(guild_id, {}).pop(entry, None)
+        if task is None:
+            self.misses += 1
+            return None
+
+        try:
+            # Still resolving: wait for it rather than starting a second extraction.
+            # Shielded so our own cancellation can be told apart from the prefetch being cancelled.
+            resolved = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # We were cancelled ourselves, not the prefetch
+                raise
+            resolved = None
+        except Exception:
+            resolved = None
+
+        if not resolved or not resolved.is_stream_fresh(self.safety_margin):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return resolved
+
+    def clear(self, guild_id):
+        # Queue cleared (e.g. /stop): drop everything in flight for the guild
+        for task in self._tasks.pop(guild_id, {}).values():
+            task.cancel()
+
+    @property
+    def in_flight(self):
+        return sum(1 for tasks in self._tasks.values() for task in tasks.values() if not task.done())
+
+    def stats(self):
+        return {'in_flight': self.in_flight, 'hits': self.hits, 'misses': self.misses}
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Prefetch failed: {task.exception()}")
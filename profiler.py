@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+import metrics
+
+# Frames from files under this directory are the bot's own code, for the report summary
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _is_idle(frame):
+    # The loop thread is waiting in the selector, i.e. not busy
+    code = frame.f_code
+    return code.co_name == 'select' and code.co_filename.endswith('selectors.py')
+
+
+class LoopWatchdog:
+    # Measures how late the event loop wakes up and catches the code responsible for stalls.
+    #
+    # A heartbeat coroutine sleeps `interval` at a time and records the lag on every wake-up.
+    # A daemon thread watches the heartbeat: when it has not moved for `threshold` seconds the
+    # loop is blocked right now, so the thread logs the loop thread's current stack. That is
+    # the frame doing the blocking, which the lag measured afterwards can no longer tell us.
+    def __init__(self, interval=0.1, threshold=0.5, stack_limit=40):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self.thread_id = None  # event loop thread, set by run()
+
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        threading.Thread(target=self._watch, name='loop-watchdog', daemon=True).start()
+
+        try:
+            while True:
+                start = loop.time()
+                await asyncio.sleep(self.interval)
+                lag = max(loop.time() - start - self.interval, 0.0)
+                self._last_beat = time.monotonic()
+
+                metrics.loop_lag_seconds.set(lag)
+                self.max_lag = max(self.max_lag, lag)
+                if lag > self.threshold:
+                    self.stalls += 1
+                    logging.warning(f"Event loop lagged {lag:.2f}s")
+        finally:
+            self._stop.set()
+
+    def _watch(self):
+        reported = None  # heartbeat the last stack was logged for, so one stall logs once
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            if beat == reported or time.monotonic() - beat < self.threshold:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame, limit=self.stack_limit))
+            del frame
+            logging.warning(f"Event loop blocked for more than {self.threshold}s, loop thread is at:\n{stack}")
+
+    def stats(self):
+        return {'stalls': self.stalls, 'max_lag': self.max_lag}
+
+
+class SamplingProfiler:
+    # Samples the event loop thread's stack every `interval` seconds from a separate thread.
+    # Nothing is hooked into the interpreter, so the loop itself runs at full speed; the cost is
+    # one sys._current_frames() call per sample. Running coroutines show up in the stack under
+    # the Task.__step that resumed them, so the report attributes loop time to handlers.
+    def __init__(self, thread_id, interval=0.01):
+        self.thread_id = thread_id
+        self.interval = interval
+
+        self.stacks = Counter()  # 'file:function;file:function' (outermost first) -> samples
+        self.own = set()  # labels of frames from the bot's own files
+        self.samples = 0
+        self.idle = 0  # samples where the loop was waiting for I/O
+        self.started = None
+        self.stopped = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.time()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            if _is_idle(frame):
+                self.idle += 1
+                continue
+
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                if code.co_filename.startswith(PROJECT_DIR):
+                    self.own.add(label)
+                labels.append(label)
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def top(self, count=10):
+        # The bot's own functions by share of busy samples, counting each once per stack
+        inclusive = Counter()
+        for stack, samples in self.stacks.items():
+            for label in set(stack.split(';')) & self.own:
+                inclusive[label] += samples
+        return inclusive.most_common(count)
+
+    def write(self, path):
+        # Collapsed stacks, one "frame;frame;frame count" line each (flamegraph.pl / speedscope input)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as report:
+            for stack, samples in self.stacks.most_common():
+                report.write(f"{stack} {samples}\n")
+            if self.idle:
+                report.write(f"(idle) {self.idle}\n")
+        return path
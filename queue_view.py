@@ -0,0 +1,75 @@
+import logging
+
+import nextcord
+
+
+class QueueView(nextcord.ui.View):
+    # Buttons under a /queue reply to page through the queue. Pages are rendered when they are
+    # asked for, from the live queue, so only the visible page's titles are ever looked up.
+    # Only the user who ran /queue can turn pages; the buttons are disabled after `timeout`.
+    def __init__(self, render, page_count, owner_id, timeout=120):
+        super().__init__(timeout=timeout)
+        self.render = render  # coroutine function: page index -> Embed
+        self.page_count = page_count  # function: () -> number of pages right now
+        self.owner_id = owner_id
+        self.page = 0
+        self.message = None
+
+    async def start(self, interaction):
+        # Send the first page; the buttons are only attached when there is more than one page.
+        # Rendering can look titles up over the network, so the interaction is acknowledged first
+        # (Discord drops it after 3 seconds) and the page goes out as a followup.
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+        embed = await self.render(0)
+        if self.page_count() <= 1:
+            self.stop()
+            await interaction.followup.send(embed=embed)
+            return
+        self.update_buttons()
+        self.message = await interaction.followup.send(embed=embed, view=self)
+
+    def update_buttons(self):
+        last = self.page_count() - 1
+        self.first_page.disabled = self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= last
+
+    async def show(self, interaction, page):
+        # Acknowledge the click before rendering, then edit the message in place
+        await interaction.response.defer()
+        # The queue may have shrunk since the last page was drawn
+        self.page = max(0, min(page, self.page_count() - 1))
+        embed = await self.render(self.page)
+        self.update_buttons()
+        await interaction.edit_original_message(embed=embed, view=self)
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("Use `/queue` to browse the queue yourself.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except nextcord.HTTPException as e:
+                logging.warning(f"Could not disable the queue buttons: {e}")
+
+    @nextcord.ui.button(emoji='⏮️', style=nextcord.ButtonStyle.secondary)
+    async def first_page(self, button, interaction):
+        await self.show(interaction, 0)
+
+    @nextcord.ui.button(emoji='◀️', style=nextcord.ButtonStyle.primary)
+    async def previous_page(self, button, interaction):
+        await self.show(interaction, self.page - 1)
+
+    @nextcord.ui.button(emoji='▶️', style=nextcord.ButtonStyle.primary)
+    async def next_page(self, button, interaction):
+        await self.show(interaction, self.page + 1)
+
+    @nextcord.ui.button(emoji='⏭️', style=nextcord.ButtonStyle.secondary)
+    async def last_page(self, button, interaction):
+        await self.show(interaction, self.page_count() - 1)
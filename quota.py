@@ -0,0 +1,110 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo('America/Los_Angeles')
+except Exception:  # no tz database (e.g. Windows without tzdata)
+    PACIFIC = timezone(timedelta(hours=-8))
+
+
+# Data API cost in quota units per call
+ENDPOINT_COSTS = {
+    'search': 100,
+    'videos': 1,
+    'playlists': 1,
+    'playlistItems': 1,
+}
+
+
+def next_quota_reset(now=None):
+    # Daily Data API quota resets at midnight Pacific time
+    now = now or datetime.now(PACIFIC)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+
+class QuotaScheduler:
+    # Token bucket over Data API quota units.
+    #
+    # The bucket holds up to `burst` units and refills at (daily_quota - burst) / 24h, so even
+    # a full burst followed by a day of steady use stays inside the daily quota. Cheap calls
+    # (videos / playlists, 1 unit) may use the whole bucket; expensive ones (search, 100 units)
+    # must leave `reserve` units behind, so titles and playlist imports keep working after
+    # searches have used up their share. Denied calls are expected to fall back to yt_dlp.
+    def __init__(self, daily_quota=10000, burst=2000, reserve=500, cheap_cost=1):
+        self.daily_quota = daily_quota
+        self.burst = min(burst, daily_quota)
+        self.reserve = reserve
+        self.cheap_cost = cheap_cost
+        self.rate = max(daily_quota - self.burst, 0) / 86400  # units per second
+
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+        # Spend since the last Pacific midnight, for reporting
+        self.spent_today = 0
+        self._reset_at = next_quota_reset()
+        self.exhausted_until = 0  # set when Google itself reports quotaExceeded
+
+        self.allowed = 0
+        self.denied = 0
+        self.fallbacks = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        if time.time() >= self._reset_at:
+            self.spent_today = 0
+            self.exhausted_until = 0
+            self._reset_at = next_quota_reset()
+
+    def try_spend(self, cost):
+        # True when a call costing `cost` units may go to the API now
+        self._refill()
+        if self.exhausted_until > time.time():
+            self.denied += 1
+            return False
+
+        floor = 0 if cost <= self.cheap_cost else self.reserve
+        if self.tokens - cost < floor:
+            self.denied += 1
+            return False
+
+        self.tokens -= cost
+        self.spent_today += cost
+        self.allowed += 1
+        return True
+
+    def exhaust(self):
+        # Google rejected a call for quota: stop sending any until the daily reset
+        self._refill()
+        if self.exhausted_until <= time.time():
+            logging.warning("YouTube Data API quota exhausted, using yt_dlp until the daily reset")
+        self.tokens = 0.0
+        self.exhausted_until = self._reset_at
+
+    def record_fallback(self):
+        self.fallbacks += 1
+
+    @property
+    def remaining(self):
+        self._refill()
+        if self.exhausted_until > time.time():
+            return 0
+        return max(self.daily_quota - self.spent_today, 0)
+
+    def stats(self):
+        self._refill()
+        return {
+            'daily_quota': self.daily_quota,
+            'remaining': self.remaining,
+            'tokens': int(self.tokens),
+            'allowed': self.allowed,
+            'denied': self.denied,
+            'fallbacks': self.fallbacks,
+            'exhausted': self.exhausted_until > time.time(),
+        }
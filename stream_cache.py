@@ -0,0 +1,59 @@
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+
+def parse_stream_expiry(stream_url):
+    # googlevideo URLs carry their expiry as ?expire=<unix ts> (or /expire/<ts>/ in manifest URLs)
+    if not stream_url:
+        return None
+    expire = parse_qs(urlparse(stream_url).query).get('expire')
+    if expire and expire[0].isdigit():
+        return int(expire[0])
+    match = re.search(r'/expire/(\d+)', stream_url)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+class StreamCache:
+    # Resolved stream URLs keyed by video ID, reused until shortly before they expire.
+    def __init__(self, max_entries=2000, safety_margin=120, default_ttl=1800):
+        self.max_entries = max_entries
+        self.safety_margin = safety_margin  # stop handing out a URL this many seconds before expiry
+        self.default_ttl = default_ttl  # used when the URL carries no expire= parameter
+        self._entries = OrderedDict()  # key -> (stream_url, expires_at, codec)
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, duration=None):
+        # Returns (stream_url, expires_at, codec) or None. With the track's `duration` the URL
+        # also has to outlive the whole track, or ffmpeg's reconnect near the end gets a 403.
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[1] - self.safety_margin <= time.time() + (duration or 0):
+            # Too close to expiry, force a fresh resolve
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, stream_url, codec=None):
+        expires_at = parse_stream_expiry(stream_url) or time.time() + self.default_ttl
+        entry = self._entries[key] = (stream_url, expires_at, codec)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
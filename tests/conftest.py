@@ -0,0 +1,38 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def bot_module(tmp_path_factory):
+    # bot.py reads config.json from the working directory and opens its log and SQLite files at import
+    workdir = tmp_path_factory.mktemp('bot')
+    with open(os.path.join(ROOT, 'config.json')) as config_file:
+        config = json.load(config_file)
+    config.update({
+        'youtube_api_key': 'test',
+        'metrics_enabled': False,
+        'audio_cache_enabled': False,
+        'log_console': False,
+        'log_path': str(workdir / 'bot.log'),
+        'queue_store_path': str(workdir / 'queues.sqlite3'),
+        'metadata_cache_path': str(workdir / 'metadata_cache.sqlite3'),
+    })
+    with open(workdir / 'config.json', 'w') as config_file:
+        json.dump(config, config_file)
+
+    # The client takes the current event loop; asyncio.run() in other tests leaves none set
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import bot
+    finally:
+        os.chdir(cwd)
+    return bot
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from concurrency import FairLimiter, SingleFlight
+
+
+def test_single_flight_shares_result():
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return {'id': key}
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do('a', fetch, 'a') for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert calls == ['a']
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'in_flight': 0, 'started': 1, 'coalesced': 4}
+
+
+def test_single_flight_shares_exception():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('extraction failed')
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do('a', fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
+
+
+def test_single_flight_cancelled_waiter_leaves_call_running():
+    started = []
+
+    async def fetch():
+        started.append(None)
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def main():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do('a', fetch))
+        second = asyncio.create_task(flight.do('a', fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 'done'
+    assert len(started) == 1
+
+
+def test_single_flight_cancels_call_when_last_waiter_leaves():
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(None)
+            raise
+
+    async def main():
+        flight = SingleFlight()
+        waiter = asyncio.create_task(flight.do('a', fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return flight.in_flight
+
+    assert asyncio.run(main()) == 0
+    assert cancelled
+
+
+def test_fair_limiter_round_robin():
+    served = []
+
+    async def main():
+        limiter = FairLimiter('test', 1)
+        await limiter.acquire('busy')  # hold the only slot while everybody queues up
+
+        async def call(guild, index):
+            async with limiter.slot(guild):
+                served.append((guild, index))
+
+        # Guild 1 queues three calls before guilds 2 and 3 ask for one each
+        tasks = [asyncio.create_task(call(1, index)) for index in range(3)]
+        tasks += [asyncio.create_task(call(2, 0)), asyncio.create_task(call(3, 0))]
+        await asyncio.sleep(0)
+        assert limiter.waiting == 5
+
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert served == [(1, 0), (2, 0), (3, 0), (1, 1), (1, 2)]
+    assert limiter.active == 0
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from executor import ExtractionExecutor, ExtractionTimeout
+
+
+def test_timed_out_call_keeps_its_slot_until_the_worker_finishes():
+    release = threading.Event()
+
+    def hung():
+        release.wait(5)
+        return 'hung'
+
+    def short():
+        time.sleep(0.05)
+        return 'short'
+
+    async def main():
+        executor = ExtractionExecutor(max_workers=1)
+        try:
+            with pytest.raises(ExtractionTimeout):
+                await executor.run(hung, timeout=0.05)
+
+            # The hung worker still occupies the only thread: the next call waits for a slot,
+            # and its timeout only starts once it actually runs
+            follow_up = asyncio.create_task(executor.run(short, timeout=0.3))
+            await asyncio.sleep(0.4)
+            assert not follow_up.done()
+            assert executor.stats()['queue_depth'] == 1
+            assert executor.stats()['running'] == 1
+
+            release.set()
+            result = await follow_up
+            await asyncio.sleep(0)
+            return result, executor.stats()
+        finally:
+            release.set()
+            executor.shutdown()
+
+    result, stats = asyncio.run(main())
+    assert result == 'short'
+    assert stats['queue_depth'] == 0
+    assert stats['running'] == 0
+    assert stats['limiters'][0]['active'] == 0
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import shutil
+
+from persistence import QueueStore, replay
+from player import QueueEntry, TrackQueue
+
+GUILD_ID = 100000000000000002
+
+
+def entry(video_id):
+    return QueueEntry(video_id=video_id, title=f"Track {video_id}")
+
+
+def ids(records):
+    return [record[0] for record in records]
+
+
+def test_replay_applies_ops_in_order():
+    entries, now_playing = replay([['a', None, None, None, None]], None, [
+        ('push', [['b', None, None, None, None], ['c', None, None, None, None]]),
+        ('pushleft', [['x', None, None, None, None]]),
+        ('pop', 1),
+        ('now', ['x', None, None, None, None]),
+    ])
+    assert ids(entries) == ['a', 'b', 'c']
+    assert now_playing[0] == 'x'
+
+
+async def fill(store):
+    # Ops on both sides of a compaction: the restore has to combine the snapshot with the newer log
+    queue = TrackQueue(journal=store.journal_for(GUILD_ID))
+    queue.extend([entry('a'), entry('b'), entry('c'), entry('d')])
+    now = queue.popleft()
+    queue.record('now', now)
+    await store.compact()
+
+    queue.appendleft(entry('x'))
+    queue.append(entry('e'))
+    queue.remove(queue[2])  # 'c', journaled as a full reset
+    await store.flush()
+    return queue
+
+
+def test_restore_after_compaction(tmp_path):
+    path = str(tmp_path / 'queues.sqlite3')
+
+    async def write():
+        store = QueueStore(path=path)
+        queue = await fill(store)
+        await store.close()
+        return [item.video_id for item in queue]
+
+    async def reopen():
+        store = QueueStore(path=path)
+        try:
+            return await store.load(GUILD_ID)
+        finally:
+            await store.close()
+
+    expected = asyncio.run(write())
+    entries, now_playing = asyncio.run(reopen())
+    assert expected == ['x', 'b', 'd', 'e']
+    assert ids(entries) == expected
+    assert now_playing[0] == 'a'
+
+
+def test_restore_ignores_half_written_last_record(tmp_path):
+    path = str(tmp_path / 'queues.sqlite3')
+    crashed = str(tmp_path / 'crashed.sqlite3')
+
+    async def write_and_crash():
+        store = QueueStore(path=path)
+        queue = await fill(store)
+        queue.append(entry('f'))
+        await store.flush()
+        # Copy the database while it is still open, as a killed process would leave it,
+        # and cut the WAL off in the middle of the last committed transaction
+        shutil.copy(path, crashed)
+        shutil.copy(path + '-wal', crashed + '-wal')
+        with open(crashed + '-wal', 'r+b') as wal:
+            wal.truncate(os.path.getsize(crashed + '-wal') - 100)
+        await store.close()
+
+    async def reopen():
+        store = QueueStore(path=crashed)
+        try:
+            return await store.load(GUILD_ID)
+        finally:
+            await store.close()
+
+    asyncio.run(write_and_crash())
+    entries, now_playing = asyncio.run(reopen())
+    # The torn transaction (appending 'f') is dropped, everything before it survives
+    assert ids(entries) == ['x', 'b', 'd', 'e']
+    assert now_playing[0] == 'a'
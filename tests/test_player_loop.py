@@ -0,0 +1,39 @@
+import time
+
+import executor
+import metrics
+
+GUILD_ID = 100000000000000001
+
+
+class IdleVoiceClient:
+    # Connected and silent; the test never gets as far as playing anything
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return False
+
+
+def slow_extract_info(url, ydl_opts):
+    time.sleep(0.2)
+    return {}
+
+
+def test_extraction_timeout_skips_to_next_track(bot_module, monkeypatch):
+    bot = bot_module.bot
+    monkeypatch.setattr(executor, '_extract_info', slow_extract_info)
+    monkeypatch.setattr(bot.extractor, 'default_timeout', 0.05)
+
+    player = bot.players.get_or_create(GUILD_ID)
+    player.voice_client = IdleVoiceClient()
+    for index in range(3):
+        player.queue.append(bot.make_queue_entry(f"https://www.youtube.com/watch?v=timeout{index:04d}"))
+    timeouts_before = metrics.playback_errors._values.get(('timeout',), 0)
+
+    # Every track times out; the loop has to skip each one and end with the queue drained
+    bot.loop.run_until_complete(bot.player_loop(GUILD_ID))
+
+    assert not player.queue
+    assert not player.is_playing
+    assert metrics.playback_errors._values.get(('timeout',), 0) - timeouts_before == 3
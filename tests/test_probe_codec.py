@@ -0,0 +1,29 @@
+import nextcord
+
+from player import QueueEntry
+
+
+def test_probe_codec_asks_ffprobe_for_unknown_sources(bot_module, monkeypatch):
+    probed = []
+
+    def fake_probe(source, executable='ffmpeg'):
+        probed.append(source)
+        return 'aac', 128
+
+    monkeypatch.setattr(nextcord.FFmpegOpusAudio, '_probe_codec_fallback', staticmethod(fake_probe))
+    bot = bot_module.bot
+
+    # A cached .m4a file and a stream yt_dlp reported no codec for both need a probe
+    entry = QueueEntry(video_id='probe000001')
+    assert bot.loop.run_until_complete(bot.probe_codec(entry, '/cache/probe000001.m4a')) == 'aac'
+    entry.set_stream('https://rr1.googlevideo.com/videoplayback?id=probe000001', 0)
+    assert bot.loop.run_until_complete(bot.probe_codec(entry)) == 'aac'
+    assert probed == ['/cache/probe000001.m4a', entry.stream_url]
+
+
+def test_probe_codec_trusts_known_codecs(bot_module):
+    bot = bot_module.bot
+    entry = QueueEntry(video_id='probe000002')
+    entry.set_stream('https://rr1.googlevideo.com/videoplayback?id=probe000002', 0, 'opus')
+    assert bot.loop.run_until_complete(bot.probe_codec(entry)) == 'opus'
+    assert bot.loop.run_until_complete(bot.probe_codec(entry, '/cache/probe000002.webm')) == 'opus'
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import random
+import re
+import time
+
+import aiohttp
+
+import metrics
+from quota import ENDPOINT_COSTS
+
+
+API_URL = 'https://www.googleapis.com/youtube/v3/'
+
+# Worth another attempt: rate limiting and server-side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_iso8601_duration(value):
+    # Data API durations look like PT1H2M3S
+    match = re.fullmatch(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', value or '')
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(part) if part else 0 for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def best_thumbnail(snippet):
+    thumbnails = snippet.get('thumbnails', {})
+    return next((thumbnails[size]['url'] for size in ('high', 'medium', 'default') if size in thumbnails), None)
+
+
+class YouTubeAPIError(Exception):
+    def __init__(self, message, status=None, reason=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason  # e.g. 'quotaExceeded', 'playlistNotFound'
+
+
+class QuotaExceeded(YouTubeAPIError):
+    # Out of quota, either by our own budget (QuotaScheduler) or according to Google
+    pass
+
+
+# -- Response records: only the fields the bot reads --------------------------------------
+
+class Video:
+    __slots__ = ('video_id', 'title', 'channel', 'duration', 'thumbnail')
+
+    def __init__(self, video_id, title=None, channel=None, duration=None, thumbnail=None):
+        self.video_id = video_id
+        self.title = title
+        self.channel = channel
+        self.duration = duration  # seconds
+        self.thumbnail = thumbnail
+
+    @classmethod
+    def from_item(cls, item):
+        # videos.list item
+        snippet = item.get('snippet', {})
+        return cls(
+            item['id'],
+            title=snippet.get('title'),
+            channel=snippet.get('channelTitle'),
+            duration=parse_iso8601_duration(item.get('contentDetails', {}).get('duration')),
+            thumbnail=best_thumbnail(snippet),
+        )
+
+    def metadata(self):
+        # Shape stored by MetadataCache
+        return {'title': self.title, 'duration': self.duration, 'channel': self.channel, 'thumbnail': self.thumbnail}
+
+
+class Playlist:
+    __slots__ = ('playlist_id', 'title', 'channel', 'item_count')
+
+    def __init__(self, playlist_id, title=None, channel=None, item_count=None):
+        self.playlist_id = playlist_id
+        self.title = title
+        self.channel = channel
+        self.item_count = item_count
+
+    @classmethod
+    def from_item(cls, item):
+        snippet = item.get('snippet', {})
+        return cls(
+            item['id'],
+            title=snippet.get('title'),
+            channel=snippet.get('channelTitle'),
+            item_count=item.get('contentDetails', {}).get('itemCount'),
+        )
+
+
+class PlaylistItem:
+    __slots__ = ('video_id', 'title', 'position')
+
+    def __init__(self, video_id, title=None, position=None):
+        self.video_id = video_id
+        self.title = title
+        self.position = position
+
+    @classmethod
+    def from_item(cls, item):
+        snippet = item.get('snippet', {})
+        return cls(item['contentDetails']['videoId'], title=snippet.get('title'), position=snippet.get('position'))
+
+
+class SearchResult:
+    __slots__ = ('video_id', 'title', 'channel')
+
+    def __init__(self, video_id, title=None, channel=None):
+        self.video_id = video_id
+        self.title = title
+        self.channel = channel
+
+    @classmethod
+    def from_item(cls, item):
+        snippet = item.get('snippet', {})
+        return cls(item['id']['videoId'], title=snippet.get('title'), channel=snippet.get('channelTitle'))
+
+    @property
+    def url(self):
+        return f"https://www.youtube.com/watch?v={self.video_id}"
+
+
+class Page:
+    # One page of a paginated list call
+    __slots__ = ('items', 'next_page_token', 'total_results')
+
+    def __init__(self, items, next_page_token=None, total_results=None):
+        self.items = items
+        self.next_page_token = next_page_token
+        self.total_results = total_results
+
+
+# -- Client --------------------------------------------------------------------------------
+
+class YouTubeAPI:
+    # Async YouTube Data API v3 client for the endpoints the bot uses.
+    # All calls share one keep-alive aiohttp session; failed calls are retried with
+    # exponential backoff and full jitter. `limiter` (a FairLimiter) bounds concurrency and
+    # `quota` (a QuotaScheduler) decides whether a call may spend its units at all.
+    def __init__(self, api_key, limiter=None, quota=None, max_connections=20, timeout=15, retries=3, backoff=0.5):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.quota = quota
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.latency_total = 0.0
+
+    def _get_session(self):
+        # Created lazily: aiohttp sessions must be made inside the running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip'},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, endpoint, params):
+        if self.quota is not None and not self.quota.try_spend(ENDPOINT_COSTS.get(endpoint, 1)):
+            metrics.api_requests.inc(endpoint, 'quota_budget')
+            raise QuotaExceeded(f"{endpoint} skipped: quota budget exhausted", reason='quotaBudget')
+
+        params = {key: value for key, value in params.items() if value is not None}
+        params['key'] = self.api_key
+
+        if self.limiter is not None:
+            async with self.limiter.slot():
+                return await self._request_with_retries(endpoint, params)
+        return await self._request_with_retries(endpoint, params)
+
+    async def _request_with_retries(self, endpoint, params):
+        session = self._get_session()
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                async with session.get(API_URL + endpoint, params=params) as response:
+                    body = await response.json(content_type=None)
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                status, body, error = None, None, e
+            else:
+                error = None
+            finally:
+                self.requests += 1
+                self.latency_total += time.monotonic() - start
+            metrics.api_requests.inc(endpoint, str(status) if status else 'error')
+
+            if status == 200:
+                return body
+
+            reason = None
+            if isinstance(body, dict) and body.get('error'):
+                errors = body['error'].get('errors') or [{}]
+                reason = errors[0].get('reason')
+                error = body['error'].get('message') or reason
+
+            # Quota errors come back as 403 and will not clear up by retrying
+            if reason in ('quotaExceeded', 'dailyLimitExceeded'):
+                self.failures += 1
+                if self.quota is not None:
+                    self.quota.exhaust()
+                raise QuotaExceeded(f"{endpoint} failed ({status}): {error}", status=status, reason=reason)
+
+            retryable = status is None or status in RETRY_STATUSES or reason in ('rateLimitExceeded', 'backendError')
+            if not retryable or attempt >= self.retries:
+                self.failures += 1
+                raise YouTubeAPIError(f"{endpoint} failed ({status}): {error}", status=status, reason=reason)
+
+            attempt += 1
+            self.retried += 1
+            delay = random.uniform(0, self.backoff * 2 ** attempt)  # full jitter
+            logging.warning(f"YouTube API {endpoint} failed ({status}: {error}), retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    # -- Endpoints ---------------------------------------------------------------------------
+
+    async def search(self, query, max_results=5, search_type='video'):
+        # search.list; 100 quota units per call
+        response = await self._request('search', {'q': query, 'part': 'snippet', 'maxResults': max_results, 'type': search_type})
+        return [SearchResult.from_item(item) for item in response.get('items', []) if item.get('id', {}).get('videoId')]
+
+    async def videos(self, video_ids, part='snippet,contentDetails'):
+        # videos.list for up to 50 IDs
+        if not video_ids:
+            return []
+        # No maxResults: the API does not support it together with id
+        response = await self._request('videos', {'id': ','.join(video_ids), 'part': part})
+        return [Video.from_item(item) for item in response.get('items', [])]
+
+    async def video(self, video_id, part='snippet,contentDetails'):
+        videos = await self.videos([video_id], part=part)
+        return videos[0] if videos else None
+
+    async def playlist(self, playlist_id):
+        # playlists.list; None when the playlist does not exist or is private
+        response = await self._request('playlists', {'id': playlist_id, 'part': 'snippet,contentDetails'})
+        items = response.get('items', [])
+        return Playlist.from_item(items[0]) if items else None
+
+    async def playlist_items(self, playlist_id, max_results=50, page_token=None):
+        # One page of playlistItems.list
+        response = await self._request('playlistItems', {
+            'playlistId': playlist_id,
+            'part': 'snippet,contentDetails',
+            'maxResults': max_results,
+            'pageToken': page_token,
+        })
+        return Page(
+            [PlaylistItem.from_item(item) for item in response.get('items', [])],
+            next_page_token=response.get('nextPageToken'),
+            total_results=response.get('pageInfo', {}).get('totalResults'),
+        )
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'retried': self.retried,
+            'failures': self.failures,
+            'avg_latency': self.latency_total / self.requests if self.requests else 0.0,
+        }